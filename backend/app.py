@@ -1,14 +1,34 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import ast
+import json
 import time
+import uuid
+import base64
+import socket
+import asyncio
+import shutil
 import threading
-from queue import Queue
+from collections import namedtuple
 from dotenv import load_dotenv
 from services.deepseek_service import DeepSeekService
+from services.llm_providers import get_llm_provider, provider_names, describe_providers, circuit_pause
+from services.adaptive_limiter import LLMUnavailableError, CircuitOpenError
+from services.json_repair import InvalidResultError
+from services.match_worker_pool import MatchWorkerPool
+from services.token_counter import estimate_tokens
 from services.pdf_parser import PDFParser
+from services.resume_ingestion import save_upload, content_path, hash_file, parse_resume_files
+from services.match_cache import MatchCache
+from services.task_registry import TaskRegistry
+from services.file_cleaner import FileCleaner
+from services.single_flight import SingleFlight
+from services.retriever import build_term_vector, rank_resumes, shortlist
+from services import resume_search
+import db_config
 
 # 加载环境变量
 load_dotenv()
@@ -16,64 +36,236 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# 数据库配置
+# 数据库配置（连接池、WAL和PRAGMA见 db_config.py）
 import os
 database_dir = os.path.join(os.path.dirname(__file__), '..', 'database')
 os.makedirs(database_dir, exist_ok=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(database_dir, "resume_match.db")}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db_config.configure_app(app, os.path.join(database_dir, "resume_match.db"))
 
 db = SQLAlchemy(app)
+with app.app_context():
+    db_config.register_pragmas(db.engine)
+
+# 匹配结果缓存（独立的SQLite文件，避免与业务库争用写锁）
+match_cache = MatchCache(os.path.join(database_dir, 'match_cache.db'))
+
+# 进行中的匹配请求按缓存键（岗位描述、简历内容、模型、提示词版本）合并，相同的并发请求只调用一次LLM
+match_flights = SingleFlight()
 
-# 全局变量存储匹配进度
-match_progress = {}
-progress_lock = threading.Lock()
+# 匹配的实时进度（当前处理的文件、流式部分得分），任务和条目状态持久化在数据库中
+match_progress = TaskRegistry('match')
+
+# 简历解析入库进度
+ingest_progress = TaskRegistry('ingest')
 
 # 数据库模型
 class JobDescription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
+    # 该岗位使用的LLM服务提供方，为空时使用 LLM_PROVIDER 默认值
+    llm_provider = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 岗位描述最近一次修改的时间，早于该时间的匹配结果视为过期
+    updated_at = db.Column(db.DateTime)
     
     def to_dict(self):
         return {
             'id': self.id,
             'title': self.title,
             'description': self.description,
-            'created_at': self.created_at.isoformat()
+            'llm_provider': self.llm_provider,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Resume(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    parsed_content = db.Column(db.Text)
+    filename = db.Column(db.String(200), nullable=False, index=True)
+    # 原始PDF的SHA-256，文件按该哈希存储在uploads目录，重复上传据此去重
+    file_hash = db.Column(db.String(64), unique=True, index=True)
+    # 正文等大字段默认不加载，列表只查询摘要字段，需要正文时显式加载
+    content = db.deferred(db.Column(db.Text, nullable=False))
+    parsed_content = db.deferred(db.Column(db.Text))
+    file_size = db.Column(db.Integer)
+    page_count = db.Column(db.Integer)
+    # 上传时预先计算的词频向量（NumPy数组序列化），用于批量匹配前的初筛，默认不加载
+    term_vector = db.deferred(db.Column(db.LargeBinary))
+    # 生成content/parsed_content的解析器版本（PDFParser.VERSION），为空表示未知的旧版本
+    parser_version = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
+    # 列表接口只需要的字段
+    SUMMARY_COLUMNS = ('filename', 'file_size', 'page_count', 'parser_version', 'created_at')
+    
+    def to_summary(self):
         return {
             'id': self.id,
             'filename': self.filename,
-            'content': self.content[:100] + '...' if len(self.content) > 100 else self.content,
-            'parsed_content': self.parsed_content,
+            'size': self.file_size,
+            'page_count': self.page_count,
+            'parser_version': self.parser_version,
             'created_at': self.created_at.isoformat()
         }
+    
+    def to_dict(self):
+        return dict(
+            self.to_summary(),
+            content=self.content,
+            parsed_content=self.parsed_content
+        )
 
 class MatchResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    job_description_id = db.Column(db.Integer, db.ForeignKey('job_description.id'), nullable=False)
-    resume_id = db.Column(db.Integer, db.ForeignKey('resume.id'), nullable=False)
-    match_score = db.Column(db.Float, nullable=False)
+    job_description_id = db.Column(db.Integer, db.ForeignKey('job_description.id'), nullable=False, index=True)
+    resume_id = db.Column(db.Integer, db.ForeignKey('resume.id'), nullable=False, index=True)
+    match_score = db.Column(db.Float, nullable=False, index=True)
     analysis_result = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 本次分析实际消耗的token数（命中缓存时为空）
+    prompt_tokens = db.Column(db.Integer)
+    completion_tokens = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     job_description = db.relationship('JobDescription', backref='match_results')
     resume = db.relationship('Resume', backref='match_results')
+    dimension_scores = db.relationship('MatchDimensionScore', backref='match_result', cascade='all, delete-orphan')
+    
+    @classmethod
+    def from_analysis(cls, job_description_id, resume_id, match_result):
+        """根据分析结果创建匹配记录：分析结果以JSON存储，各维度得分写入子表便于索引查询"""
+        usage = match_result.get('token_usage') or {}
+        record = cls(
+            job_description_id=job_description_id,
+            resume_id=resume_id,
+            match_score=match_result.get('total_score', 0),
+            analysis_result=json.dumps(
+                {key: value for key, value in match_result.items() if key != 'token_usage'}, ensure_ascii=False
+            ),
+            prompt_tokens=usage.get('prompt_tokens'),
+            completion_tokens=usage.get('completion_tokens')
+        )
+        record.dimension_scores = [
+            MatchDimensionScore(
+                job_description_id=job_description_id,
+                resume_id=resume_id,
+                dimension=dimension,
+                score=score
+            )
+            for dimension, score in extract_dimension_scores(match_result)
+        ]
+        return record
+
+class MatchDimensionScore(db.Model):
+    """匹配结果的各维度得分（从analysis_result的dimension_scores中拆出）"""
+    id = db.Column(db.Integer, primary_key=True)
+    match_result_id = db.Column(db.Integer, db.ForeignKey('match_result.id'), nullable=False, index=True)
+    job_description_id = db.Column(db.Integer, nullable=False)
+    resume_id = db.Column(db.Integer, nullable=False)
+    dimension = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_dimension_score_job_dimension_score', 'job_description_id', 'dimension', 'score'),
+    )
+
+class MatchTask(db.Model):
+    """持久化的批量匹配任务"""
+    id = db.Column(db.String(64), primary_key=True)
+    job_description_id = db.Column(db.Integer, nullable=True)
+    # pending / processing / completed / cancelled
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    # 执行方式、并发数、速率限制等选项（JSON）
+    options = db.Column(db.Text, nullable=False, default='{}')
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def get_options(self):
+        return json.loads(self.options or '{}')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_description_id': self.job_description_id,
+            'status': self.status,
+            'total': self.total,
+            'options': self.get_options(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class MatchTaskItem(db.Model):
+    """批量匹配任务中的单个(岗位, 简历)条目，worker通过租约领取"""
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.String(64), db.ForeignKey('match_task.id'), nullable=False)
+    job_description_id = db.Column(db.Integer, nullable=False)
+    resume_id = db.Column(db.Integer, nullable=False)
+    # pending / processing / completed / failed / cancelled
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    match_result_id = db.Column(db.Integer)
+    worker_id = db.Column(db.String(200))
+    claim_token = db.Column(db.String(32), index=True)
+    lease_expires_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    # 任务内的结束顺序号，作为进度事件流的事件ID（断线后从该序号之后继续推送）
+    finished_seq = db.Column(db.Integer)
+    
+    __table_args__ = (
+        db.Index('ix_match_task_item_task_status', 'task_id', 'status'),
+        db.Index('ix_match_task_item_status_lease', 'status', 'lease_expires_at'),
+        db.Index('ix_match_task_item_task_finished_seq', 'task_id', 'finished_seq'),
+    )
+
+def extract_dimension_scores(match_result):
+    """从分析结果中提取 [(维度, 得分)]，兼容 {"score": 85} 和直接给出数字两种格式"""
+    dimension_scores = match_result.get('dimension_scores') or {}
+    if not isinstance(dimension_scores, dict):
+        return []
+    scores = []
+    for dimension, value in dimension_scores.items():
+        score = value.get('score') if isinstance(value, dict) else value
+        try:
+            scores.append((str(dimension)[:50], float(score)))
+        except (TypeError, ValueError):
+            continue
+    return scores
+
+def _add_missing_columns(table_name, columns):
+    """为已有的表补充新增的列（db.create_all不会修改已存在的表结构）"""
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns(table_name)}
+    with db.engine.begin() as connection:
+        for name, ddl in columns:
+            if name not in existing:
+                connection.execute(db.text(f'ALTER TABLE {table_name} ADD COLUMN {name} {ddl}'))
 
 # 创建数据库表
 with app.app_context():
     db.create_all()
+    _add_missing_columns('resume', [
+        ('file_hash', 'VARCHAR(64)'),
+        ('term_vector', 'BLOB'),
+        ('file_size', 'INTEGER'),
+        ('page_count', 'INTEGER'),
+        ('parser_version', 'INTEGER')
+    ])
+    _add_missing_columns('match_task_item', [('finished_seq', 'INTEGER')])
+    _add_missing_columns('job_description', [('llm_provider', 'VARCHAR(50)'), ('updated_at', 'DATETIME')])
+    _add_missing_columns('match_result', [('prompt_tokens', 'INTEGER'), ('completion_tokens', 'INTEGER')])
+    with db.engine.begin() as connection:
+        db_config.ensure_indexes(connection)
+        connection.execute(db.text('CREATE UNIQUE INDEX IF NOT EXISTS ix_resume_file_hash ON resume (file_hash)'))
+        connection.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_match_task_item_task_finished_seq ON match_task_item (task_id, finished_seq)'
+        ))
+        # 简历全文索引（FTS5），为已有简历补建索引
+        indexed = resume_search.ensure_index(connection)
+        if indexed:
+            print(f"已为 {indexed} 份简历建立全文索引")
 
 # API路由
 @app.route('/api/jobs', methods=['GET'])
@@ -84,9 +276,12 @@ def get_jobs():
 @app.route('/api/jobs', methods=['POST'])
 def create_job():
     data = request.get_json()
+    if data.get('llm_provider') and data['llm_provider'] not in provider_names():
+        return jsonify({'error': f"Unknown LLM provider: {data['llm_provider']}"}), 400
     job = JobDescription(
         title=data.get('title', ''),
-        description=data.get('description', '')
+        description=data.get('description', ''),
+        llm_provider=data.get('llm_provider') or None
     )
     db.session.add(job)
     db.session.commit()
@@ -95,8 +290,10 @@ def create_job():
 @app.route('/api/jobs/<int:id>', methods=['DELETE'])
 def delete_job(id):
     job = JobDescription.query.get_or_404(id)
+    _delete_match_results(MatchResult.job_description_id == id)
     db.session.delete(job)
     db.session.commit()
+    match_cache.invalidate_job(id)
     return jsonify({'message': '删除成功'}), 200
 
 @app.route('/api/jobs/<int:id>', methods=['PUT'])
@@ -104,16 +301,88 @@ def update_job(id):
     job = JobDescription.query.get_or_404(id)
     data = request.get_json()
     
+    if data.get('llm_provider') and data['llm_provider'] not in provider_names():
+        return jsonify({'error': f"Unknown LLM provider: {data['llm_provider']}"}), 400
+    
+    old_description = job.description
     job.title = data.get('title', job.title)
     job.description = data.get('description', job.description)
+    if 'llm_provider' in data:
+        job.llm_provider = data['llm_provider'] or None
+    # 岗位描述变化后，旧的匹配缓存和匹配结果不再有效
+    description_changed = job.description != old_description
+    if description_changed:
+        job.updated_at = datetime.utcnow()
     
     db.session.commit()
+    
+    if description_changed:
+        match_cache.invalidate_job(id)
     return jsonify(job.to_dict()), 200
 
+def _resume_summary_query():
+    return Resume.query.options(db.load_only(*[getattr(Resume, name) for name in Resume.SUMMARY_COLUMNS]))
+
 @app.route('/api/resumes', methods=['GET'])
 def get_resumes():
-    resumes = Resume.query.order_by(Resume.created_at.desc()).all()
-    return jsonify([resume.to_dict() for resume in resumes])
+    """
+    分页列出简历摘要（按上传时间倒序，游标分页），不返回正文
+
+    查询参数：limit（默认50，最大1000），cursor（上一页返回的next_cursor）
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+        cursor = _decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid query parameters'}), 400
+    
+    # 自增ID与上传时间同序，按ID做键集分页
+    query = _resume_summary_query()
+    if cursor:
+        query = query.filter(Resume.id < cursor[0])
+    resumes = query.order_by(Resume.id.desc()).limit(limit + 1).all()
+    has_more = len(resumes) > limit
+    resumes = resumes[:limit]
+    
+    return jsonify({
+        'items': [resume.to_summary() for resume in resumes],
+        'next_cursor': _encode_cursor([resumes[-1].id]) if has_more else None,
+        'has_more': has_more
+    })
+
+@app.route('/api/resumes/<int:id>', methods=['GET'])
+def get_resume(id):
+    """获取简历详情（包含完整正文）"""
+    resume = Resume.query.options(db.undefer(Resume.content), db.undefer(Resume.parsed_content)).get_or_404(id)
+    return jsonify(resume.to_dict()), 200
+
+@app.route('/api/resumes/search', methods=['GET'])
+def search_resumes():
+    """
+    全文搜索简历，按相关度排序并分页
+
+    参数：q 关键词（空格分隔多个词，需同时命中）、page、per_page
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    total, hits = resume_search.search(db.session, query, limit=per_page, offset=(page - 1) * per_page)
+    resumes = {
+        resume.id: resume
+        for resume in _resume_summary_query().filter(Resume.id.in_([resume_id for resume_id, _ in hits]))
+    }
+    return jsonify({
+        'items': [
+            dict(resumes[resume_id].to_summary(), score=score)
+            for resume_id, score in hits if resume_id in resumes
+        ],
+        'total': total,
+        'page': page,
+        'per_page': per_page
+    }), 200
 
 @app.route('/api/resumes', methods=['POST'])
 def upload_resume():
@@ -134,64 +403,412 @@ def upload_resume():
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir)
     
-    results = []
-    
+    # 请求线程只负责把文件流式写入磁盘并计算内容哈希，解析交给后台进程池
+    ingest_id = f"ingest_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    file_statuses = []
+    uploaded = []
     for file in valid_files:
         try:
-            # 保存文件到uploads目录
-            file_path = os.path.join(upload_dir, file.filename)
-            file.save(file_path)
-            
-            # 解析PDF文件
-            pdf_content = PDFParser.parse_pdf(file)
-            
-            resume = Resume(
-                filename=file.filename,
-                content=pdf_content,
-                parsed_content=pdf_content  # 这里可以添加更复杂的解析逻辑
-            )
-            db.session.add(resume)
-            results.append({
-                'success': True,
-                'filename': file.filename,
-                'data': resume.to_dict()
-            })
+            file_hash, file_size, temp_path = save_upload(file, upload_dir)
+            uploaded.append((len(file_statuses), file.filename, file_hash, temp_path))
+            file_statuses.append({'filename': file.filename, 'status': 'queued', 'file_hash': file_hash})
         except Exception as e:
-            results.append({
-                'success': False,
+            file_statuses.append({
                 'filename': file.filename,
-                'error': f'Error processing file: {str(e)}'
+                'status': 'failed',
+                'error': f'Error saving file: {str(e)}'
             })
     
-    # 一次性提交所有数据库更改
+    # 解析前按内容哈希去重：已入库的文件直接关联已有简历，同一批次内的重复文件只解析一次
+    existing = dict(
+        db.session.query(Resume.file_hash, Resume.id)
+        .filter(Resume.file_hash.in_([file_hash for _, _, file_hash, _ in uploaded]))
+        .all()
+    ) if uploaded else {}
+    saved_files = []
+    first_index_by_hash = {}
+    for index, filename, file_hash, temp_path in uploaded:
+        if file_hash in existing or file_hash in first_index_by_hash:
+            os.remove(temp_path)
+            file_statuses[index]['status'] = 'duplicate'
+            if file_hash in existing:
+                file_statuses[index]['resume_id'] = existing[file_hash]
+            else:
+                saved_files[first_index_by_hash[file_hash]][4].append(index)
+            continue
+        file_path = content_path(upload_dir, file_hash)
+        os.replace(temp_path, file_path)
+        first_index_by_hash[file_hash] = len(saved_files)
+        saved_files.append((index, filename, file_hash, file_path, []))
+    
+    failed_count = len(valid_files) - len(uploaded)
+    duplicate_count = len([item for item in file_statuses if item['status'] == 'duplicate' and 'resume_id' in item])
+    ingest_progress.create(ingest_id, {
+        'status': 'processing' if saved_files else 'completed',
+        'total': len(valid_files),
+        'processed': failed_count + duplicate_count,
+        'succeeded': 0,
+        'duplicates': duplicate_count,
+        'failed': failed_count,
+        'files': file_statuses
+    })
+    if not saved_files:
+        ingest_progress.finish(ingest_id)
+    
+    if saved_files:
+        thread = threading.Thread(target=_run_ingestion, args=(ingest_id, saved_files))
+        thread.daemon = True
+        thread.start()
+    
+    return jsonify({
+        'ingest_id': ingest_id,
+        'message': f'已接收 {len(saved_files)}/{len(valid_files)} 个新文件，正在后台解析',
+        'total': len(valid_files),
+        'duplicates': len(uploaded) - len(saved_files)
+    }), 202
+
+def _update_ingest_file(ingest_id, index, duplicate_indexes, status, resume_id=None, error=None):
+    """更新单个文件（以及同批次中与其内容相同的文件）的入库状态"""
+    with ingest_progress.edit(ingest_id) as progress:
+        if progress is None:
+            return
+        for position, file_index in enumerate([index] + duplicate_indexes):
+            item = progress['files'][file_index]
+            if error:
+                item['status'] = 'failed'
+                item['error'] = error
+                progress['failed'] += 1
+            else:
+                item['status'] = status if position == 0 else 'duplicate'
+                item['resume_id'] = resume_id
+                if item['status'] == 'saved':
+                    progress['succeeded'] += 1
+                else:
+                    progress['duplicates'] += 1
+            progress['processed'] += 1
+
+def _run_ingestion(ingest_id, saved_files):
+    """在进程池中并行解析已保存的简历文件，并分块批量写入数据库"""
+    duplicates_of = {index: duplicate_indexes for index, _, _, _, duplicate_indexes in saved_files}
+    with ingest_progress.edit(ingest_id) as progress:
+        if progress is not None:
+            for index, _, _, _, _ in saved_files:
+                progress['files'][index]['status'] = 'parsing'
+    
+    batch_size = int(os.getenv('INGEST_BATCH_SIZE', 50))
+    pending_rows = []
+    file_paths = {index: file_path for index, _, _, file_path, _ in saved_files}
+    
+    def discard_file(index):
+        """解析或入库失败时删除已按内容哈希保存的文件（仍被其他简历引用时由清理线程保留）"""
+        file_cleaner.remove([file_paths[index]])
+    
+    def save_one(index, duplicate_indexes, resume):
+        """并发上传同一文件导致唯一索引冲突时，逐行写入并关联已有简历"""
+        existing = Resume.query.filter_by(file_hash=resume.file_hash).first()
+        if existing:
+            _update_ingest_file(ingest_id, index, duplicate_indexes, 'duplicate', resume_id=existing.id)
+            return
+        try:
+            db.session.add(resume)
+            db.session.flush()
+            resume_search.index_resumes(db.session, [(resume.id, resume.filename, resume.content)])
+            db.session.commit()
+            _update_ingest_file(ingest_id, index, duplicate_indexes, 'saved', resume_id=resume.id)
+        except Exception as e:
+            db.session.rollback()
+            _update_ingest_file(ingest_id, index, duplicate_indexes, 'failed', error=f'Database error: {str(e)}')
+            discard_file(index)
+    
+    def flush():
+        if not pending_rows:
+            return
+        try:
+            db.session.add_all([resume for _, _, resume in pending_rows])
+            db.session.flush()
+            # 全文索引与简历记录在同一事务中写入
+            resume_search.index_resumes(db.session, [
+                (resume.id, resume.filename, resume.content) for _, _, resume in pending_rows
+            ])
+            db.session.commit()
+            for index, duplicate_indexes, resume in pending_rows:
+                _update_ingest_file(ingest_id, index, duplicate_indexes, 'saved', resume_id=resume.id)
+        except Exception:
+            db.session.rollback()
+            for index, duplicate_indexes, resume in pending_rows:
+                save_one(index, duplicate_indexes, Resume(
+                    filename=resume.filename,
+                    file_hash=resume.file_hash,
+                    content=resume.content,
+                    parsed_content=resume.parsed_content,
+                    file_size=resume.file_size,
+                    page_count=resume.page_count,
+                    term_vector=resume.term_vector,
+                    parser_version=resume.parser_version
+                ))
+        pending_rows.clear()
+    
+    file_info = {
+        index: (filename, file_hash, os.path.getsize(file_path))
+        for index, filename, file_hash, file_path, _ in saved_files
+    }
+    with app.app_context():
+        for index, parsed, error in parse_resume_files([(index, file_paths[index]) for index in file_paths]):
+            duplicate_indexes = duplicates_of[index]
+            filename, file_hash, file_size = file_info[index]
+            if error is not None:
+                _update_ingest_file(ingest_id, index, duplicate_indexes, 'failed', error=f'Error processing file: {str(error)}')
+                discard_file(index)
+                continue
+            pdf_content, page_count, term_vector = parsed
+            
+            with ingest_progress.edit(ingest_id) as progress:
+                if progress is not None:
+                    progress['files'][index]['status'] = 'parsed'
+            pending_rows.append((index, duplicate_indexes, Resume(
+                filename=filename,
+                file_hash=file_hash,
+                content=pdf_content,
+                parsed_content=pdf_content,  # 这里可以添加更复杂的解析逻辑
+                file_size=file_size,
+                page_count=page_count,
+                term_vector=term_vector,
+                parser_version=PDFParser.VERSION
+            )))
+            if len(pending_rows) >= batch_size:
+                flush()
+        flush()
+    
+    with ingest_progress.edit(ingest_id) as progress:
+        if progress is not None:
+            progress['status'] = 'completed'
+    ingest_progress.finish(ingest_id)
+
+@app.route('/api/resumes/ingest/<ingest_id>', methods=['GET'])
+def get_ingest_progress(ingest_id):
+    """获取简历解析入库进度"""
+    progress = ingest_progress.get(ingest_id)
+    if not progress:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    
+    return jsonify(progress), 200
+
+# 同一进程内同时只运行一个重新解析任务
+_reparse_lock = threading.Lock()
+
+def _outdated_resume_filter():
+    """解析结果由旧版本解析器生成（或版本未知）的简历"""
+    return db.or_(Resume.parser_version.is_(None), Resume.parser_version < PDFParser.VERSION)
+
+def _save_reparsed(rows, updates):
+    """批量写入重新解析的结果并更新全文索引；解析期间被删除的简历跳过"""
+    existing = {
+        resume_id for (resume_id,) in
+        db.session.query(Resume.id).filter(Resume.id.in_([update['id'] for update in updates]))
+    }
+    updates = [update for update in updates if update['id'] in existing]
+    if not updates:
+        return 0
     try:
+        db.session.execute(db.update(Resume), updates)
+        resume_search.index_resumes(db.session, [
+            (update['id'], rows[update['id']].filename, update['content']) for update in updates
+        ])
         db.session.commit()
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Database error: {str(e)}'}), 500
+        raise
+    return len(updates)
+
+def backfill_file_hashes():
+    """
+    为按文件名存储、没有file_hash的旧简历计算文件哈希，并把文件复制到按哈希存储的位置，
+    之后重复上传同一文件能在解析前被识别。文件缺失或哈希已被其他简历使用的记录保持原样，返回补齐的数量
+    """
+    upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
+    filled = 0
+    with app.app_context():
+        # 旧的存储方式下同名上传共用一个文件，同名的记录中只有第一条能关联该文件的哈希（唯一索引）
+        ids_by_filename = {}
+        for resume_id, filename in (
+            db.session.query(Resume.id, Resume.filename).filter(Resume.file_hash.is_(None)).order_by(Resume.id)
+        ):
+            ids_by_filename.setdefault(filename, []).append(resume_id)
+        for filename, resume_ids in ids_by_filename.items():
+            legacy_path = os.path.join(upload_dir, filename)
+            if not os.path.isfile(legacy_path):
+                continue
+            file_hash = hash_file(legacy_path)
+            if db.session.query(Resume.id).filter_by(file_hash=file_hash).first():
+                continue
+            shutil.copyfile(legacy_path, content_path(upload_dir, file_hash))
+            Resume.query.filter_by(id=resume_ids[0]).update({'file_hash': file_hash}, synchronize_session=False)
+            db.session.commit()
+            if len(resume_ids) == 1:
+                os.remove(legacy_path)
+            filled += 1
+    return filled
+
+def run_reparse(batch_size=None, on_batch=None):
+    """
+    用当前版本的解析器增量重新解析过期的简历，返回统计信息
+
+    按ID分批从uploads目录读取PDF，在解析进程池中并行解析，每批一次性更新正文、词频向量、
+    页数、文件大小、解析器版本和全文索引。文件缺失或解析失败的简历保持原样，下次运行时重试
+    on_batch(stats): 可选回调，每批写入后调用
+    """
+    batch_size = int(batch_size or os.getenv('INGEST_BATCH_SIZE', 50))
+    stats = {'processed': 0, 'reparsed': 0, 'missing': 0, 'failed': 0, 'hashed': backfill_file_hashes()}
+    last_id = 0
+    with app.app_context():
+        while True:
+            rows = (
+                db.session.query(Resume.id, Resume.filename, Resume.file_hash)
+                .filter(_outdated_resume_filter(), Resume.id > last_id)
+                .order_by(Resume.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            file_paths = {}
+            for row in rows:
+                file_path = _resume_file_path(row)
+                if not os.path.exists(file_path):
+                    stats['missing'] += 1
+                    continue
+                file_paths[row.id] = file_path
+            
+            updates = []
+            for resume_id, parsed, error in parse_resume_files(list(file_paths.items())):
+                if error is not None:
+                    stats['failed'] += 1
+                    print(f"简历 {resume_id} 重新解析失败: {error}")
+                    continue
+                content, page_count, term_vector = parsed
+                updates.append({
+                    'id': resume_id,
+                    'content': content,
+                    'parsed_content': content,
+                    'page_count': page_count,
+                    'file_size': os.path.getsize(file_paths[resume_id]),
+                    'term_vector': term_vector,
+                    'parser_version': PDFParser.VERSION
+                })
+            if updates:
+                stats['reparsed'] += _save_reparsed({row.id: row for row in rows}, updates)
+            stats['processed'] += len(rows)
+            if on_batch:
+                on_batch(dict(stats))
+    return stats
+
+def _run_reparse_task(reparse_id):
+    def on_batch(stats):
+        with ingest_progress.edit(reparse_id) as progress:
+            if progress is not None:
+                progress.update(stats)
     
-    # 返回批量上传结果
+    try:
+        stats = run_reparse(on_batch=on_batch)
+        print(f"重新解析完成: {stats}")
+        with ingest_progress.edit(reparse_id) as progress:
+            if progress is not None:
+                progress.update(stats, status='completed')
+    except Exception as e:
+        print(f"重新解析失败: {e}")
+        with ingest_progress.edit(reparse_id) as progress:
+            if progress is not None:
+                progress.update(status='failed', error=str(e))
+    finally:
+        ingest_progress.finish(reparse_id)
+        _reparse_lock.release()
+
+@app.route('/api/resumes/reparse', methods=['GET'])
+def get_reparse_status():
+    """当前解析器版本和需要重新解析的简历数"""
     return jsonify({
-        'message': f'上传完成，成功 {len([r for r in results if r["success"]])}/{len(valid_files)} 个文件',
-        'results': results
-    }), 201
+        'parser_version': PDFParser.VERSION,
+        'outdated': Resume.query.filter(_outdated_resume_filter()).count(),
+        'running': _reparse_lock.locked()
+    }), 200
 
-@app.route('/api/resumes/<int:id>', methods=['DELETE'])
-def delete_resume(id):
-    resume = Resume.query.get_or_404(id)
+@app.route('/api/resumes/reparse', methods=['POST'])
+def reparse_resumes():
+    """在后台用当前版本的解析器重新解析过期的简历，进度通过 /api/resumes/ingest/<id> 查询"""
+    outdated = Resume.query.filter(_outdated_resume_filter()).count()
+    if not outdated:
+        return jsonify({'message': '所有简历均已由当前版本的解析器解析', 'total': 0}), 200
+    if not _reparse_lock.acquire(blocking=False):
+        return jsonify({'error': '已有重新解析任务正在运行'}), 409
     
-    # 删除uploads目录中的文件
-    upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-    file_path = os.path.join(upload_dir, resume.filename)
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            print(f"Error deleting file {file_path}: {str(e)}")
+    reparse_id = f"reparse_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    ingest_progress.create(reparse_id, {
+        'status': 'processing',
+        'parser_version': PDFParser.VERSION,
+        'total': outdated,
+        'processed': 0,
+        'reparsed': 0,
+        'missing': 0,
+        'failed': 0
+    })
+    thread = threading.Thread(target=_run_reparse_task, args=(reparse_id,))
+    thread.daemon = True
+    thread.start()
     
-    # 删除数据库记录
-    db.session.delete(resume)
+    return jsonify({
+        'ingest_id': reparse_id,
+        'message': f'正在后台重新解析 {outdated} 份简历',
+        'total': outdated
+    }), 202
+
+def _resume_file_path(resume):
+    """简历PDF的存储路径：按内容哈希存储，旧数据仍按原文件名存储"""
+    upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
+    if resume.file_hash:
+        return content_path(upload_dir, resume.file_hash)
+    return os.path.join(upload_dir, resume.filename)
+
+def _file_still_referenced(file_path):
+    """文件在等待删除期间又被上传（同一内容哈希已重新入库）时保留"""
+    file_hash, extension = os.path.splitext(os.path.basename(file_path))
+    if extension != '.pdf' or len(file_hash) != 64:
+        return False
+    with app.app_context():
+        return db.session.query(Resume.id).filter_by(file_hash=file_hash).first() is not None
+
+# 后台文件清理：删除简历时只提交数据库事务，PDF文件由清理线程删除
+file_cleaner = FileCleaner(keep=_file_still_referenced)
+
+def _delete_match_results(condition):
+    """按条件批量删除匹配结果及其维度得分"""
+    match_result_ids = db.session.query(MatchResult.id).filter(condition).scalar_subquery()
+    MatchDimensionScore.query.filter(
+        MatchDimensionScore.match_result_id.in_(match_result_ids)
+    ).delete(synchronize_session=False)
+    return MatchResult.query.filter(condition).delete(synchronize_session=False)
+
+def _delete_resumes(ids):
+    """
+    批量删除简历：一次IN查询取出文件信息，在同一个事务中删除匹配结果、全文索引和简历记录，
+    提交后把PDF文件交给后台清理线程。返回实际删除的简历ID
+    """
+    rows = db.session.query(Resume.id, Resume.filename, Resume.file_hash).filter(Resume.id.in_(ids)).all()
+    found_ids = [resume_id for resume_id, _, _ in rows]
+    if not found_ids:
+        return []
+    _delete_match_results(MatchResult.resume_id.in_(found_ids))
+    resume_search.remove_resumes(db.session, found_ids)
+    Resume.query.filter(Resume.id.in_(found_ids)).delete(synchronize_session=False)
     db.session.commit()
+    file_cleaner.remove([_resume_file_path(row) for row in rows])
+    return found_ids
+
+@app.route('/api/resumes/<int:id>', methods=['DELETE'])
+def delete_resume(id):
+    if not _delete_resumes([id]):
+        return jsonify({'error': 'Resume not found'}), 404
     return jsonify({'message': '删除成功'}), 200
 
 @app.route('/api/resumes/batch', methods=['DELETE'])
@@ -202,49 +819,53 @@ def batch_delete_resumes():
     if not ids:
         return jsonify({'error': '未提供要删除的简历ID'}), 400
     
-    # 确保uploads目录存在
-    upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-    
-    deleted_count = 0
-    errors = []
-    
-    for id in ids:
-        try:
-            resume = Resume.query.get(id)
-            if not resume:
-                errors.append(f'ID {id} 的简历不存在')
-                continue
-                
-            # 删除uploads目录中的文件
-            file_path = os.path.join(upload_dir, resume.filename)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Error deleting file {file_path}: {str(e)}")
-            
-            # 删除数据库记录
-            db.session.delete(resume)
-            deleted_count += 1
-        except Exception as e:
-            errors.append(f'删除ID {id} 的简历时出错: {str(e)}')
-    
     try:
-        db.session.commit()
+        deleted_ids = _delete_resumes(ids)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'数据库操作失败: {str(e)}'}), 500
     
     response_data = {
-        'message': f'成功删除 {deleted_count} 个简历',
-        'deleted_count': deleted_count
+        'message': f'成功删除 {len(deleted_ids)} 个简历',
+        'deleted_count': len(deleted_ids)
     }
     
-    if errors:
-        response_data['errors'] = errors
+    missing_ids = set(ids) - set(deleted_ids)
+    if missing_ids:
+        response_data['errors'] = [f'ID {id} 的简历不存在' for id in ids if id in missing_ids]
     
     return jsonify(response_data), 200
 
+def _match_cache_key(job_description, resume_content, llm):
+    # 不同服务提供方的结果分开缓存
+    return MatchCache.make_key(job_description, resume_content, f'{llm.name}/{llm.model}', DeepSeekService.PROMPT_VERSION)
+
+def _without_token_usage(match_result):
+    # token用量只属于产生结果的那次请求，缓存命中和共享的结果不重复计入
+    return {key: value for key, value in match_result.items() if key != 'token_usage'}
+
+def _store_match_cache(cache_key, job_id, match_result):
+    # 模拟结果不写入缓存，避免API恢复后仍返回假数据
+    if not match_result.get('mock'):
+        match_cache.set(cache_key, job_id, _without_token_usage(match_result))
+
+def _analyze_match_cached(job_id, job_description, resume_content, provider=None):
+    """带缓存的匹配分析，命中时直接返回，不消耗API调用；相同的请求正在进行时等待并共享其结果"""
+    llm = get_llm_provider(provider)
+    cache_key = _match_cache_key(job_description, resume_content, llm)
+    
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    def analyze():
+        match_result = llm.analyze_match(job_description, resume_content)
+        _store_match_cache(cache_key, job_id, match_result)
+        return match_result
+    
+    match_result, shared = match_flights.do(cache_key, analyze)
+    return _without_token_usage(match_result) if shared else match_result
+
 @app.route('/api/match', methods=['POST'])
 def match_resume():
     data = request.get_json()
@@ -260,71 +881,221 @@ def match_resume():
     if not job or not resume:
         return jsonify({'error': 'Job or Resume not found'}), 404
     
+    provider = data.get('provider') or job.llm_provider
+    if provider and provider not in provider_names():
+        return jsonify({'error': f'Unknown LLM provider: {provider}'}), 400
+    
     try:
-        # 调用DeepSeek API进行匹配分析
-        deepseek_service = DeepSeekService()
-        match_result = deepseek_service.analyze_match(job.description, resume.content)
+        # 调用LLM进行匹配分析（优先读取缓存），服务提供方按请求、岗位、默认配置的顺序选择
+        match_result = _analyze_match_cached(job.id, job.description, resume.content, provider=provider)
         
         # 保存匹配结果
-        match_record = MatchResult(
-            job_description_id=job_id,
-            resume_id=resume_id,
-            match_score=match_result.get('total_score', 0),
-            analysis_result=str(match_result)
-        )
+        match_record = MatchResult.from_analysis(job_id, resume_id, match_result)
         db.session.add(match_record)
         db.session.commit()
         
         return jsonify(match_result), 200
+    except LLMUnavailableError as e:
+        response = jsonify({'error': f'LLM服务暂时不可用，请稍后重试: {str(e)}'})
+        if e.retry_after:
+            response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+        return response, 503
+    except InvalidResultError as e:
+        return jsonify({'error': f'LLM返回的结果无效，请稍后重试: {str(e)}'}), 502
     except Exception as e:
         return jsonify({'error': f'Error during matching: {str(e)}'}), 500
 
+@app.route('/api/jobs/<int:id>/top-candidates', methods=['GET'])
+def get_top_candidates(id):
+    """
+    按维度得分查询岗位的优秀候选人，例如 ?dimension=专业技能&min_score=80
+
+    不传dimension时按匹配总分排序；同一份简历只取最新的匹配结果；limit默认20，最大200
+    """
+    JobDescription.query.get_or_404(id)
+    dimension = request.args.get('dimension')
+    min_score = request.args.get('min_score', type=float)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    
+    # 同一份简历可能被多次匹配，只取每份简历最新的一次结果
+    latest = db.session.query(
+        MatchResult.id,
+        db.func.row_number().over(
+            partition_by=MatchResult.resume_id,
+            order_by=(MatchResult.created_at.desc(), MatchResult.id.desc())
+        ).label('rank')
+    ).filter(MatchResult.job_description_id == id).subquery()
+    
+    if dimension:
+        query = db.session.query(
+            MatchDimensionScore.match_result_id, MatchDimensionScore.resume_id,
+            MatchDimensionScore.score, MatchResult.match_score, MatchResult.created_at, Resume.filename
+        ).join(MatchResult, MatchResult.id == MatchDimensionScore.match_result_id
+        ).join(latest, db.and_(latest.c.id == MatchResult.id, latest.c.rank == 1)
+        ).join(Resume, Resume.id == MatchDimensionScore.resume_id
+        ).filter(MatchDimensionScore.job_description_id == id, MatchDimensionScore.dimension == dimension)
+        if min_score is not None:
+            query = query.filter(MatchDimensionScore.score >= min_score)
+        query = query.order_by(MatchDimensionScore.score.desc(), MatchResult.match_score.desc())
+    else:
+        query = db.session.query(
+            MatchResult.id, MatchResult.resume_id, MatchResult.match_score.label('score'),
+            MatchResult.match_score, MatchResult.created_at, Resume.filename
+        ).join(latest, db.and_(latest.c.id == MatchResult.id, latest.c.rank == 1)
+        ).join(Resume, Resume.id == MatchResult.resume_id)
+        if min_score is not None:
+            query = query.filter(MatchResult.match_score >= min_score)
+        query = query.order_by(MatchResult.match_score.desc())
+    
+    return jsonify([
+        {
+            'match_result_id': match_result_id,
+            'resume_id': resume_id,
+            'resume_filename': filename,
+            'dimension': dimension,
+            'dimension_score': score if dimension else None,
+            'match_score': match_score,
+            'created_at': created_at.isoformat()
+        }
+        for match_result_id, resume_id, score, match_score, created_at, filename in query.limit(limit).all()
+    ]), 200
+
+def _parse_analysis_result(result):
+    """解析analysis_result中的数据，并确保包含必要的字段"""
+    analysis_data = {}
+    try:
+        # 首先尝试JSON解析
+        analysis_data = json.loads(result.analysis_result)
+    except json.JSONDecodeError:
+        # 如果JSON解析失败，尝试使用ast.literal_eval解析Python字典格式
+        try:
+            analysis_data = ast.literal_eval(result.analysis_result)
+        except:
+            # 如果两种方法都失败，使用默认结构
+            analysis_data = {
+                'dimension_scores': {},
+                'total_score': result.match_score,
+                'overall_assessment': '分析结果解析失败',
+                'improvement_suggestions': []
+            }
+    
+    # 确保analysis_data包含必要的字段
+    if 'dimension_scores' not in analysis_data:
+        analysis_data['dimension_scores'] = {}
+    if 'total_score' not in analysis_data:
+        analysis_data['total_score'] = result.match_score
+    if 'overall_assessment' not in analysis_data:
+        analysis_data['overall_assessment'] = '总体评估'
+    if 'improvement_suggestions' not in analysis_data:
+        analysis_data['improvement_suggestions'] = []
+    return analysis_data
+
+def _match_result_summary(result):
+    return {
+        'id': result.id,
+        'job_description_id': result.job_description_id,
+        'resume_id': result.resume_id,
+        'job_title': result.job_description.title if result.job_description else None,
+        'resume_filename': result.resume.filename if result.resume else None,
+        'match_score': result.match_score,
+        'prompt_tokens': result.prompt_tokens,
+        'completion_tokens': result.completion_tokens,
+        'created_at': result.created_at.isoformat()
+    }
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+
 @app.route('/api/match-results', methods=['GET'])
 def get_match_results():
-    results = MatchResult.query.order_by(MatchResult.created_at.desc()).all()
+    """
+    分页查询匹配结果（游标分页）
+
+    查询参数：job_id, min_score, max_score, date_from, date_to（ISO格式），
+    sort=created_at|score（均为降序），limit（默认50，最大200），cursor（上一页返回的next_cursor），
+    fields=summary|full（summary不返回analysis_data）
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        job_id = request.args.get('job_id', type=int)
+        min_score = request.args.get('min_score', type=float)
+        max_score = request.args.get('max_score', type=float)
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        date_from = datetime.fromisoformat(date_from) if date_from else None
+        date_to = datetime.fromisoformat(date_to) if date_to else None
+        sort = request.args.get('sort', 'created_at')
+        cursor = None
+        if request.args.get('cursor'):
+            # 游标来自客户端，解码、拆分和类型转换失败都按参数无效处理
+            cursor_value, cursor_id = _decode_cursor(request.args['cursor'])
+            cursor_value = float(cursor_value) if sort == 'score' else datetime.fromisoformat(cursor_value)
+            cursor = (cursor_value, int(cursor_id))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'查询参数无效: {str(e)}'}), 400
     
-    match_results = []
-    for result in results:
-        # 解析analysis_result中的数据
-        analysis_data = {}
-        try:
-            # 首先尝试JSON解析
-            import json
-            analysis_data = json.loads(result.analysis_result)
-        except json.JSONDecodeError:
-            # 如果JSON解析失败，尝试使用ast.literal_eval解析Python字典格式
-            try:
-                import ast
-                analysis_data = ast.literal_eval(result.analysis_result)
-            except:
-                # 如果两种方法都失败，使用默认结构
-                analysis_data = {
-                    'dimension_scores': {},
-                    'total_score': result.match_score,
-                    'overall_assessment': '分析结果解析失败',
-                    'improvement_suggestions': []
-                }
-        
-        # 确保analysis_data包含必要的字段
-        if 'dimension_scores' not in analysis_data:
-            analysis_data['dimension_scores'] = {}
-        if 'total_score' not in analysis_data:
-            analysis_data['total_score'] = result.match_score
-        if 'overall_assessment' not in analysis_data:
-            analysis_data['overall_assessment'] = '总体评估'
-        if 'improvement_suggestions' not in analysis_data:
-            analysis_data['improvement_suggestions'] = []
-        
-        match_results.append({
-            'id': result.id,
-            'job_title': result.job_description.title,
-            'resume_filename': result.resume.filename,
-            'match_score': result.match_score,
-            'created_at': result.created_at.isoformat(),
-            'analysis_data': analysis_data
-        })
+    sort_column = MatchResult.match_score if sort == 'score' else MatchResult.created_at
+    full = request.args.get('fields', 'summary') == 'full'
+    
+    # 关联的岗位标题和简历文件名通过JOIN一次性加载，只取需要的列
+    query = MatchResult.query.options(
+        db.joinedload(MatchResult.job_description).load_only(JobDescription.title),
+        db.joinedload(MatchResult.resume).load_only(Resume.filename)
+    )
+    if not full:
+        query = query.options(db.defer(MatchResult.analysis_result))
+    
+    if job_id:
+        query = query.filter(MatchResult.job_description_id == job_id)
+    if min_score is not None:
+        query = query.filter(MatchResult.match_score >= min_score)
+    if max_score is not None:
+        query = query.filter(MatchResult.match_score <= max_score)
+    if date_from:
+        query = query.filter(MatchResult.created_at >= date_from)
+    if date_to:
+        query = query.filter(MatchResult.created_at <= date_to)
+    
+    if cursor:
+        cursor_value, cursor_id = cursor
+        query = query.filter(db.or_(
+            sort_column < cursor_value,
+            db.and_(sort_column == cursor_value, MatchResult.id < cursor_id)
+        ))
     
-    return jsonify(match_results)
+    rows = query.order_by(sort_column.desc(), MatchResult.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    items = []
+    for result in rows:
+        item = _match_result_summary(result)
+        if full:
+            item['analysis_data'] = _parse_analysis_result(result)
+        items.append(item)
+    
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        last_value = last.match_score if sort == 'score' else last.created_at.isoformat()
+        next_cursor = _encode_cursor([last_value, last.id])
+    
+    return jsonify({
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
+
+@app.route('/api/match-results/<int:id>', methods=['GET'])
+def get_match_result(id):
+    """获取单条匹配结果的完整分析内容"""
+    result = MatchResult.query.get_or_404(id)
+    item = _match_result_summary(result)
+    item['analysis_data'] = _parse_analysis_result(result)
+    return jsonify(item), 200
 
 @app.route('/api/match-results/<int:id>', methods=['DELETE'])
 def delete_match_result(id):
@@ -333,10 +1104,25 @@ def delete_match_result(id):
     db.session.commit()
     return jsonify({'message': '删除成功'}), 200
 
+@app.route('/api/match-results/batch', methods=['DELETE'])
+def batch_delete_match_results():
+    """批量删除匹配结果（单条DELETE ... WHERE id IN）"""
+    ids = (request.get_json() or {}).get('ids', [])
+    if not ids:
+        return jsonify({'error': '未提供要删除的匹配结果ID'}), 400
+    try:
+        deleted_count = _delete_match_results(MatchResult.id.in_(ids))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'数据库操作失败: {str(e)}'}), 500
+    return jsonify({'message': f'成功删除 {deleted_count} 条匹配结果', 'deleted_count': deleted_count}), 200
+
 @app.route('/api/match-results', methods=['DELETE'])
 def clear_all_match_results():
     try:
-        # 删除所有匹配结果
+        # 删除所有匹配结果（先删除维度得分子表）
+        MatchDimensionScore.query.delete()
         MatchResult.query.delete()
         db.session.commit()
         return jsonify({'message': '所有匹配结果已清除'}), 200
@@ -344,60 +1130,451 @@ def clear_all_match_results():
         db.session.rollback()
         return jsonify({'error': f'清除失败: {str(e)}'}), 500
 
-def _match_single_resume(job, resume, task_id, index, total):
-    """单个简历匹配任务"""
+# 领取到的队列条目
+ClaimedItem = namedtuple('ClaimedItem', 'id claim_token task_id job_id resume_id')
+
+# 已结束的条目状态；reused 表示矩阵匹配中直接复用了未过期的已有匹配结果
+FINISHED_ITEM_STATUSES = ('completed', 'reused', 'failed', 'cancelled')
+SUCCESS_ITEM_STATUSES = ('completed', 'reused')
+
+def _set_live_progress(task_id, **values):
+    """更新进程内的实时进度（当前处理文件、流式部分得分），持久化状态以数据库为准"""
+    with match_progress.edit(task_id, {'current_filename': '', 'partial_scores': {}}) as live:
+        live.update(values)
+
+def _set_partial_score(task_id, resume_id, partial):
+    if partial is None:
+        with match_progress.edit(task_id) as live:
+            if live is not None:
+                live['partial_scores'].pop(resume_id, None)
+        return
+    with match_progress.edit(task_id, {'current_filename': '', 'partial_scores': {}}) as live:
+        # 部分结果只含各维度得分和总分，完整分析结果保存在数据库中
+        live['partial_scores'][resume_id] = partial
+
+def _next_finished_seq(task_id):
+    """任务内下一个结束顺序号（在UPDATE语句中计算，SQLite的写锁保证不重复）"""
+    finished = db.aliased(MatchTaskItem)
+    return (
+        db.select(db.func.coalesce(db.func.max(finished.finished_seq), 0) + 1)
+        .where(finished.task_id == task_id)
+        .scalar_subquery()
+    )
+
+def _cancel_match_items(task_id, condition, now):
+    """
+    把任务中满足条件的条目标记为已取消（不提交），返回条目数
+
+    一条UPDATE按ID顺序分配连续的结束顺序号，进度事件流中每个被取消的条目都有唯一的事件ID
+    """
+    numbered = (
+        db.select(
+            MatchTaskItem.id,
+            (_next_finished_seq(task_id) - 1 + db.func.row_number().over(order_by=MatchTaskItem.id)).label('seq')
+        )
+        .where(MatchTaskItem.task_id == task_id, condition)
+        .subquery()
+    )
+    return db.session.execute(
+        db.update(MatchTaskItem)
+        .where(MatchTaskItem.id == numbered.c.id)
+        .values(
+            status='cancelled', claim_token=None, lease_expires_at=None,
+            finished_at=now, finished_seq=numbered.c.seq, updated_at=now
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+def _claim_size(options):
+    """单次领取的条目数：与该任务的执行方式和并发数相匹配"""
+    engine = options.get('engine') or 'threads'
     try:
-        # 更新进度
-        with progress_lock:
-            match_progress[task_id] = {
-                'current': index + 1,
-                'total': total,
+        concurrency = int(options.get('concurrency') or 0)
+    except (ValueError, TypeError):
+        # 提交时已校验，这里兜底旧任务中的无效值，避免一条坏任务阻塞整个队列
+        concurrency = 0
+    if engine == 'async':
+        return concurrency or int(os.getenv('MATCH_ASYNC_CONCURRENCY', 100))
+    concurrency = concurrency or int(os.getenv('MATCH_CONCURRENCY', 4))
+    if engine == 'packed':
+        return concurrency * int(os.getenv('MATCH_PACK_MAX_RESUMES', 8))
+    return concurrency
+
+def _claim_match_items(worker_id):
+    """
+    从最早的未完成任务中领取一批条目，返回 (任务ID, 任务选项, [ClaimedItem])
+
+    租约过期仍处于processing的条目（worker崩溃或重启）会被重新领取；已取消任务的条目不再领取，
+    其中租约过期的条目直接标记为已取消
+    """
+    now = datetime.utcnow()
+    expired = db.and_(MatchTaskItem.status == 'processing', MatchTaskItem.lease_expires_at < now)
+    cancelled_tasks = db.select(MatchTask.id).where(MatchTask.status == 'cancelled')
+    claimable = db.and_(
+        db.or_(MatchTaskItem.status == 'pending', expired),
+        MatchTaskItem.task_id.not_in(cancelled_tasks)
+    )
+    with app.app_context():
+        try:
+            stale = db.session.query(MatchTaskItem.task_id).filter(
+                expired, MatchTaskItem.task_id.in_(cancelled_tasks)
+            ).distinct().all()
+            if stale:
+                for (task_id,) in stale:
+                    _cancel_match_items(task_id, expired, now)
+                db.session.commit()
+            
+            first = MatchTaskItem.query.filter(claimable).order_by(MatchTaskItem.id).first()
+            if not first:
+                return None, {}, []
+            task = db.session.get(MatchTask, first.task_id)
+            options = task.get_options()
+            
+            # 单条UPDATE完成领取，SQLite的写锁保证多个worker进程不会领取到同一条目
+            claim_token = uuid.uuid4().hex
+            claim_ids = db.session.query(MatchTaskItem.id).filter(
+                MatchTaskItem.task_id == task.id, claimable
+            ).order_by(MatchTaskItem.id).limit(_claim_size(options)).scalar_subquery()
+            MatchTaskItem.query.filter(MatchTaskItem.id.in_(claim_ids)).update({
                 'status': 'processing',
-                'current_filename': resume.filename,
-                'results': match_progress.get(task_id, {}).get('results', [])
-            }
+                'claim_token': claim_token,
+                'worker_id': worker_id,
+                'lease_expires_at': now + timedelta(seconds=int(os.getenv('MATCH_LEASE_SECONDS', 600))),
+                'attempts': MatchTaskItem.attempts + 1,
+                'updated_at': now
+            }, synchronize_session=False)
+            if task.status == 'pending':
+                task.status = 'processing'
+            db.session.commit()
+        except Exception as e:
+            # 其他worker正在写入（database is locked），下次轮询再领取
+            db.session.rollback()
+            print(f"领取匹配任务失败: {e}")
+            return None, {}, []
+        
+        items = [
+            ClaimedItem(item_id, claim_token, task.id, job_id, resume_id)
+            for item_id, job_id, resume_id in db.session.query(
+                MatchTaskItem.id, MatchTaskItem.job_description_id, MatchTaskItem.resume_id
+            ).filter(MatchTaskItem.claim_token == claim_token).order_by(MatchTaskItem.id)
+        ]
+        return task.id, options, items
+
+def _complete_match_item(item, match_result):
+    """保存单条匹配结果并标记条目完成（每份简历单独提交）"""
+    with app.app_context():
+        try:
+            match_record = MatchResult.from_analysis(item.job_id, item.resume_id, match_result)
+            db.session.add(match_record)
+            db.session.flush()
+            now = datetime.utcnow()
+            updated = MatchTaskItem.query.filter_by(id=item.id, claim_token=item.claim_token).update({
+                'status': 'completed',
+                'match_result_id': match_record.id,
+                'error': None,
+                'claim_token': None,
+                'lease_expires_at': None,
+                'finished_at': now,
+                'finished_seq': _next_finished_seq(item.task_id),
+                'updated_at': now
+            }, synchronize_session=False)
+            if not updated:
+                # 租约已过期并被其他worker接管，丢弃本次结果
+                db.session.rollback()
+                return
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            _fail_match_item(item, f'Database error: {str(e)}')
+    _set_partial_score(item.task_id, item.resume_id, None)
+
+def _fail_match_item(item, error, retryable=True, llm=None):
+    """
+    标记条目失败；可重试的错误在未超过最大尝试次数时放回队列
+
+    熔断期间请求没有发出（CircuitOpenError），或者服务不可用时llm的熔断器处于打开/半开状态
+    （熔断前已在途的请求、失败的探测请求），放回队列且不计入尝试次数；任务已取消时不再放回队列，标记为已取消
+    """
+    with app.app_context():
+        row = MatchTaskItem.query.filter_by(id=item.id, claim_token=item.claim_token).first()
+        if not row:
+            return
+        now = datetime.utcnow()
+        task_status = db.session.query(MatchTask.status).filter(MatchTask.id == item.task_id).scalar()
+        if isinstance(error, CircuitOpenError) or (
+            isinstance(error, LLMUnavailableError) and llm is not None and llm.limiter.breaker.state != 'closed'
+        ):
+            row.attempts = max(row.attempts - 1, 0)
+        error = str(error)
+        row.error = error
+        row.claim_token = None
+        row.lease_expires_at = None
+        row.updated_at = now
+        retry = retryable and row.attempts < int(os.getenv('MATCH_MAX_ATTEMPTS', 3))
+        if retry and task_status != 'cancelled':
+            row.status = 'pending'
+        else:
+            row.status = 'cancelled' if retry else 'failed'
+            row.finished_at = now
+            row.finished_seq = _next_finished_seq(item.task_id)
+        db.session.commit()
+    _set_partial_score(item.task_id, item.resume_id, None)
+
+def _refresh_match_task(task_id):
+    """所有条目结束后把任务标记为完成，返回任务是否已结束"""
+    with app.app_context():
+        task = db.session.get(MatchTask, task_id)
+        if not task:
+            return True
+        if task.status in ('completed', 'cancelled'):
+            return True
+        unfinished = MatchTaskItem.query.filter(
+            MatchTaskItem.task_id == task_id,
+            MatchTaskItem.status.in_(('pending', 'processing'))
+        ).count()
+        if unfinished:
+            return False
+        task.status = 'completed'
+        task.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+
+def _process_match_items(task_id, options, items, pool):
+    """按任务指定的执行方式处理一批已领取的条目"""
+    with app.app_context():
+        jobs = {}
+        job_providers = {}
+        for job in JobDescription.query.filter(JobDescription.id.in_({item.job_id for item in items})).all():
+            jobs[job.id] = job.description
+            job_providers[job.id] = job.llm_provider
+        resumes = {
+            resume_id: (filename, content)
+            for resume_id, filename, content in db.session.query(Resume.id, Resume.filename, Resume.content)
+            .filter(Resume.id.in_({item.resume_id for item in items}))
+        }
+    
+    # 先查缓存，命中的条目直接完成；相同请求正在其他线程中进行的条目等待共享结果；
+    # 其余的按服务提供方（任务指定 > 岗位指定 > 默认）分组执行
+    groups = {}
+    followers = []
+    for item in items:
+        if item.job_id not in jobs or item.resume_id not in resumes:
+            _fail_match_item(item, 'Job or Resume not found', retryable=False)
+            continue
+        job_description = jobs[item.job_id]
+        resume_content = resumes[item.resume_id][1]
+        llm = get_llm_provider(options.get('provider') or job_providers[item.job_id])
+        cache_key = _match_cache_key(job_description, resume_content, llm)
+        cached = match_cache.get(cache_key)
+        if cached is not None:
+            _complete_match_item(item, cached)
+            continue
+        call, leader = match_flights.begin(cache_key)
+        if leader:
+            groups.setdefault(llm.name, (llm, []))[1].append((item, cache_key, job_description, resume_content))
+        else:
+            followers.append((item, call, llm))
+    
+    try:
+        for llm, pending in groups.values():
+            _run_match_engine(task_id, options, llm, pending, jobs, resumes, pool)
+    finally:
+        # 未产生结果的条目（失败或打包结果缺失）也要释放，等待者随之失败并重试
+        for _, pending in groups.values():
+            for _, cache_key, _, _ in pending:
+                match_flights.finish(cache_key, error=RuntimeError('相同请求的执行者未返回结果'))
+    
+    # 先执行自己领取的条目再等待其他线程，不会互相等待
+    for item, call, llm in followers:
+        try:
+            match_result = call.wait(match_flights.timeout)
+        except Exception as e:
+            _fail_match_item(item, e, llm=llm)
+            continue
+        _complete_match_item(item, _without_token_usage(match_result))
+
+def _run_match_engine(task_id, options, llm, pending, jobs, resumes, pool):
+    """用任务指定的执行方式调用同一服务提供方处理一组未命中缓存的条目"""
+    engine = options.get('engine') or 'threads'
+    
+    def finish(item, cache_key, match_result):
+        _store_match_cache(cache_key, item.job_id, match_result)
+        match_flights.finish(cache_key, match_result)
+        _complete_match_item(item, match_result)
+    
+    if engine == 'async':
+        # 所有在途请求由同一个事件循环承载，流式输出实时更新部分得分
+        by_id = {item.id: (item, cache_key) for item, cache_key, _, _ in pending}
         
-        # 调用DeepSeek API进行匹配分析
-        deepseek_service = DeepSeekService()
-        match_result = deepseek_service.analyze_match(job.description, resume.content)
+        def on_partial(item_id, partial):
+            item = by_id[item_id][0]
+            _set_partial_score(task_id, item.resume_id, partial)
         
-        # 保存匹配结果
-        match_record = MatchResult(
-            job_description_id=job.id,
-            resume_id=resume.id,
-            match_score=match_result.get('total_score', 0),
-            analysis_result=str(match_result)
-        )
-        db.session.add(match_record)
+        # 写缓存和提交数据库是同步的SQLite写入，放到线程中执行，避免等待写锁时阻塞所有在途的流
+        async def on_result(item_id, match_result):
+            item, cache_key = by_id[item_id]
+            await asyncio.to_thread(finish, item, cache_key, match_result)
         
-        result = {
-            'resume_id': resume.id,
-            'success': True,
-            'data': match_result,
-            'resume_filename': resume.filename
-        }
+        def fail(item, cache_key, error):
+            match_flights.finish(cache_key, error=error)
+            _fail_match_item(item, error, llm=llm)
         
-        # 更新结果
-        with progress_lock:
-            match_progress[task_id]['results'].append(result)
-            match_progress[task_id]['current'] = index + 1
+        async def on_error(item_id, error):
+            item, cache_key = by_id[item_id]
+            await asyncio.to_thread(fail, item, cache_key, error)
         
-        return result
+        async def before_call(item_id, job_description, resume_content):
+            await pool.rate_limiter.acquire_async(llm.estimate_request_tokens(job_description, resume_content))
         
-    except Exception as e:
-        result = {
-            'resume_id': resume.id,
-            'success': False,
-            'error': str(e),
-            'resume_filename': resume.filename
-        }
+        asyncio.run(llm.analyze_many(
+            [(item.id, job_description, resume_content) for item, _, job_description, resume_content in pending],
+            concurrency=options.get('concurrency'),
+            on_partial=on_partial, on_result=on_result, on_error=on_error, before_call=before_call
+        ))
+    
+    elif engine == 'packed':
+        # 同一岗位的简历按token预算打包，每组一次请求，各组由线程池并发执行
+        by_resume = {}
+        for item, cache_key, job_description, resume_content in pending:
+            by_resume.setdefault(item.job_id, {})[item.resume_id] = (item, cache_key)
+        packs = []
+        for job_id, entries in by_resume.items():
+            job_description = jobs[job_id]
+            for pack in llm.pack_resumes(
+                job_description,
+                [(resume_id, resumes[resume_id][1]) for resume_id in entries],
+                token_budget=options.get('token_budget')
+            ):
+                packs.append((job_id, job_description, pack))
         
-        # 更新结果
-        with progress_lock:
-            match_progress[task_id]['results'].append(result)
-            match_progress[task_id]['current'] = index + 1
+        def run_pack(pack_info):
+            job_id, job_description, pack = pack_info
+            pool.acquire(estimate_tokens(llm._build_packed_prompt(job_description, pack)))
+            _set_live_progress(task_id, current_filename=', '.join(resumes[resume_id][0] for resume_id, _ in pack))
+            results, errors = llm.analyze_match_packed(job_description, pack)
+            for resume_id, _ in pack:
+                item, cache_key = by_resume[job_id][resume_id]
+                if resume_id in results:
+                    finish(item, cache_key, results[resume_id])
+                else:
+                    # 记录实际的失败原因，放回队列稍后重试（熔断器打开或半开时不计入尝试次数）
+                    error = errors.get(resume_id) or LLMUnavailableError('LLM服务暂时不可用')
+                    match_flights.finish(cache_key, error=error)
+                    _fail_match_item(item, error, llm=llm)
         
-        return result
+        pool.run(packs, run_pack)
+    
+    else:
+        # 在有界线程池中并发处理简历，每个工作线程使用独立的应用上下文和数据库会话
+        def run_one(entry):
+            item, cache_key, job_description, resume_content = entry
+            _set_live_progress(task_id, current_filename=resumes[item.resume_id][0])
+            try:
+                pool.acquire(llm.estimate_request_tokens(job_description, resume_content))
+                match_result = llm.analyze_match(job_description, resume_content)
+            except Exception as e:
+                match_flights.finish(cache_key, error=e)
+                _fail_match_item(item, e, llm=llm)
+                return
+            finish(item, cache_key, match_result)
+        
+        pool.run(pending, run_one)
+
+def run_match_worker(worker_id=None, stop_event=None):
+    """
+    匹配任务worker主循环：领取条目、处理、逐条提交，直到stop_event被设置
+
+    可以在Web进程内以线程方式运行，也可以通过 match_worker.py 启动多个独立进程
+    """
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+    stop_event = stop_event or threading.Event()
+    poll_interval = float(os.getenv('MATCH_WORKER_POLL_INTERVAL', 1.0))
+    pools = {}
+    print(f"匹配任务worker已启动: {worker_id}")
+    
+    while not stop_event.is_set():
+        # LLM服务熔断期间暂停领取，避免条目在熔断结束前反复领取、失败
+        pause = circuit_pause()
+        if pause:
+            stop_event.wait(min(pause, poll_interval * 5))
+            continue
+        
+        task_id, options, items = _claim_match_items(worker_id)
+        if not items:
+            stop_event.wait(poll_interval)
+            continue
+        
+        try:
+            # 每个任务使用自己的并发数和速率限制
+            if task_id not in pools:
+                pools[task_id] = MatchWorkerPool(
+                    concurrency=options.get('concurrency'),
+                    requests_per_minute=options.get('requests_per_minute'),
+                    tokens_per_minute=options.get('tokens_per_minute')
+                )
+        except Exception as e:
+            # 任务选项无效，重试也不会成功，直接标记失败
+            for item in items:
+                _fail_match_item(item, f'Invalid task options: {str(e)}', retryable=False)
+        else:
+            try:
+                _process_match_items(task_id, options, items, pools[task_id])
+            except Exception as e:
+                # 未完成的条目保持processing，租约过期后会被重新领取
+                print(f"处理匹配任务 {task_id} 出错: {e}")
+        
+        if _refresh_match_task(task_id):
+            pools.pop(task_id, None)
+            match_progress.finish(task_id)
+
+def start_embedded_match_worker():
+    """在Web进程内启动一个后台worker线程（单进程部署时无需单独运行worker）"""
+    thread = threading.Thread(target=run_match_worker, name='embedded-match-worker')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def _resume_term_vectors(resume_ids):
+    """读取简历的词频向量，旧数据缺少向量时补算并保存"""
+    rows = db.session.query(Resume.id, Resume.term_vector).filter(Resume.id.in_(resume_ids)).all()
+    missing = [resume_id for resume_id, term_vector in rows if term_vector is None]
+    vectors = {resume_id: term_vector for resume_id, term_vector in rows if term_vector is not None}
+    if missing:
+        for resume_id, content in db.session.query(Resume.id, Resume.content).filter(Resume.id.in_(missing)):
+            vectors[resume_id] = build_term_vector(content)
+            Resume.query.filter_by(id=resume_id).update({'term_vector': vectors[resume_id]}, synchronize_session=False)
+        db.session.commit()
+    return list(vectors.items())
+
+MATCH_ENGINES = ('threads', 'async', 'packed')
+
+def _parse_match_options(data):
+    """
+    校验批量/矩阵匹配请求中的执行选项，无效时抛出ValueError
+
+    concurrency、token_budget 为正整数，requests_per_minute、tokens_per_minute 为非负整数（0表示不限速）
+    """
+    options = {
+        'engine': data.get('engine') or os.getenv('MATCH_ENGINE', 'threads'),
+        'provider': data.get('provider')
+    }
+    if options['engine'] not in MATCH_ENGINES:
+        raise ValueError(f"Unknown match engine: {options['engine']}")
+    if options['provider'] and options['provider'] not in provider_names():
+        raise ValueError(f"Unknown LLM provider: {options['provider']}")
+    for key, minimum in (('concurrency', 1), ('requests_per_minute', 0), ('tokens_per_minute', 0), ('token_budget', 1)):
+        value = data.get(key)
+        if value is None:
+            continue
+        try:
+            if isinstance(value, bool):
+                raise TypeError(value)
+            options[key] = int(value)
+            if options[key] < minimum:
+                raise ValueError(value)
+        except (ValueError, TypeError):
+            raise ValueError(f'{key} must be an integer >= {minimum}')
+    return {key: value for key, value in options.items() if value is not None}
 
 @app.route('/api/batch-match', methods=['POST'])
 def batch_match_resumes():
@@ -407,111 +1584,485 @@ def batch_match_resumes():
     
     if not job_id or not resume_ids:
         return jsonify({'error': 'Job ID and Resume IDs are required'}), 400
+    # engine: threads 线程池逐个同步调用；async 单事件循环并发流式调用；packed 多份简历打包到一次请求
+    # 并发数和速率限制可以按请求覆盖，默认读取环境变量
+    try:
+        options = _parse_match_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     job = JobDescription.query.get(job_id)
     if not job:
         return jsonify({'error': 'Job not found'}), 404
     
-    # 生成任务ID
-    task_id = f"match_{int(time.time())}_{job_id}"
-    
-    # 初始化进度
-    with progress_lock:
-        match_progress[task_id] = {
-            'current': 0,
-            'total': len(resume_ids),
-            'status': 'starting',
-            'current_filename': '',
-            'results': []
-        }
+    # 初筛：按词频向量的BM25得分排序，只把Top-K或高于阈值（相对最高分，0~1）的简历交给大模型
+    shortlist_top_k = data.get('shortlist_top_k')
+    shortlist_min_score = data.get('shortlist_min_score')
+    try:
+        if shortlist_top_k is not None:
+            shortlist_top_k = int(shortlist_top_k)
+            if shortlist_top_k < 1:
+                raise ValueError(shortlist_top_k)
+        if shortlist_min_score is not None:
+            shortlist_min_score = float(shortlist_min_score)
+            if not 0 <= shortlist_min_score <= 1:
+                raise ValueError(shortlist_min_score)
+    except (ValueError, TypeError):
+        return jsonify({
+            'error': 'shortlist_top_k must be a positive integer and shortlist_min_score a number between 0 and 1'
+        }), 400
+    shortlisted = None
+    if shortlist_top_k is not None or shortlist_min_score is not None:
+        shortlisted = shortlist(
+            rank_resumes(job.description, _resume_term_vectors(resume_ids)),
+            top_k=shortlist_top_k,
+            min_score=shortlist_min_score
+        )
+        resume_ids = [resume_id for resume_id, _ in shortlisted]
+        if not resume_ids:
+            return jsonify({'error': '没有简历通过初筛', 'shortlist': []}), 400
     
-    def run_batch_match():
-        """异步执行批量匹配"""
-        with app.app_context():
-            try:
-                # 更新状态为处理中
-                with progress_lock:
-                    match_progress[task_id]['status'] = 'processing'
-                
-                # 逐个处理简历
-                for i, resume_id in enumerate(resume_ids):
-                    resume = Resume.query.get(resume_id)
-                    if not resume:
-                        # 简历不存在
-                        result = {
-                            'resume_id': resume_id,
-                            'success': False,
-                            'error': 'Resume not found',
-                            'resume_filename': f'Unknown (ID: {resume_id})'
-                        }
-                        with progress_lock:
-                            match_progress[task_id]['results'].append(result)
-                            match_progress[task_id]['current'] = i + 1
-                        continue
-                    
-                    # 执行单个匹配
-                    _match_single_resume(job, resume, task_id, i, len(resume_ids))
-                
-                # 提交所有数据库更改
-                try:
-                    db.session.commit()
-                    # 更新状态为完成
-                    with progress_lock:
-                        match_progress[task_id]['status'] = 'completed'
-                except Exception as e:
-                    db.session.rollback()
-                    with progress_lock:
-                        match_progress[task_id]['status'] = 'error'
-                        match_progress[task_id]['error'] = f'Database error: {str(e)}'
-            
-            except Exception as e:
-                with progress_lock:
-                    match_progress[task_id]['status'] = 'error'
-                    match_progress[task_id]['error'] = f'Batch match error: {str(e)}'
+    # 生成任务ID
+    task_id = f"match_{int(time.time())}_{job_id}_{uuid.uuid4().hex[:8]}"
     
-    # 启动异步任务
-    thread = threading.Thread(target=run_batch_match)
-    thread.daemon = True
-    thread.start()
+    # 任务和每份简历的条目写入持久化队列，由worker领取执行
+    task = MatchTask(
+        id=task_id,
+        job_description_id=job_id,
+        total=len(resume_ids),
+        options=json.dumps(options)
+    )
+    db.session.add(task)
+    db.session.add_all([
+        MatchTaskItem(task_id=task_id, job_description_id=job_id, resume_id=resume_id)
+        for resume_id in resume_ids
+    ])
+    db.session.commit()
     
-    return jsonify({
+    response = {
         'task_id': task_id,
         'message': '批量匹配任务已开始，请使用任务ID查询进度',
         'total': len(resume_ids)
+    }
+    if shortlisted is not None:
+        response['skipped'] = len(data.get('resume_ids', [])) - len(resume_ids)
+        response['shortlist'] = [{'resume_id': resume_id, 'score': score} for resume_id, score in shortlisted]
+    return jsonify(response), 202
+
+def _fresh_match_results(job_ids, resume_ids, max_age):
+    """
+    返回 {(岗位ID, 简历ID): 匹配结果ID}：每对取最新的一条，且生成于岗位描述最近一次修改之后、未超过max_age秒
+    """
+    if max_age <= 0:
+        return {}
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    rows = (
+        db.session.query(MatchResult.job_description_id, MatchResult.resume_id, db.func.max(MatchResult.id))
+        .join(JobDescription, JobDescription.id == MatchResult.job_description_id)
+        .filter(
+            MatchResult.job_description_id.in_(job_ids),
+            MatchResult.resume_id.in_(resume_ids),
+            MatchResult.created_at >= cutoff,
+            MatchResult.created_at >= db.func.coalesce(JobDescription.updated_at, JobDescription.created_at)
+        )
+        .group_by(MatchResult.job_description_id, MatchResult.resume_id)
+    )
+    return {(job_id, resume_id): result_id for job_id, resume_id, result_id in rows}
+
+def _schedule_matrix(job_ids, resume_ids, chunk_size):
+    """
+    矩阵匹配的执行顺序：按岗位轮转，每次取一个岗位的chunk_size份简历
+
+    chunk_size与worker单次领取的条目数一致，同一批领取的条目属于同一岗位，
+    提示词前缀（岗位描述）相同，便于服务端前缀缓存；各岗位轮流推进，不会一个岗位独占worker
+    """
+    queues = {job_id: list(resume_ids[job_id]) for job_id in job_ids}
+    order = []
+    while any(queues.values()):
+        for job_id in job_ids:
+            pending = queues[job_id]
+            order.extend((job_id, resume_id) for resume_id in pending[:chunk_size])
+            del pending[:chunk_size]
+    return order
+
+@app.route('/api/matrix-match', methods=['POST'])
+def matrix_match():
+    """
+    多岗位 × 多简历的矩阵匹配，创建一个持久化任务
+
+    请求体：job_ids, resume_ids, max_age（秒，已有匹配结果在该时间内且晚于岗位修改时直接复用，0表示全部重新匹配），
+    以及与 /api/batch-match 相同的 engine、provider、concurrency 等选项
+    """
+    data = request.get_json()
+    job_ids = list(dict.fromkeys(data.get('job_ids') or []))
+    resume_ids = list(dict.fromkeys(data.get('resume_ids') or []))
+    if not job_ids or not resume_ids:
+        return jsonify({'error': 'Job IDs and Resume IDs are required'}), 400
+    if len(job_ids) * len(resume_ids) > int(os.getenv('MATRIX_MAX_CELLS', 50000)):
+        return jsonify({'error': '匹配组合数超出上限'}), 400
+    try:
+        options = _parse_match_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        max_age = int(data.get('max_age', os.getenv('MATRIX_RESULT_MAX_AGE', 7 * 24 * 3600)))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'max_age must be an integer number of seconds'}), 400
+    
+    found_jobs = {job_id for (job_id,) in db.session.query(JobDescription.id).filter(JobDescription.id.in_(job_ids))}
+    found_resumes = {resume_id for (resume_id,) in db.session.query(Resume.id).filter(Resume.id.in_(resume_ids))}
+    missing_jobs = [job_id for job_id in job_ids if job_id not in found_jobs]
+    if missing_jobs:
+        return jsonify({'error': f'Job not found: {missing_jobs}'}), 404
+    resume_ids = [resume_id for resume_id in resume_ids if resume_id in found_resumes]
+    if not resume_ids:
+        return jsonify({'error': 'Resume not found'}), 404
+    
+    options['job_ids'] = job_ids
+    
+    fresh = _fresh_match_results(job_ids, resume_ids, max_age)
+    to_match = {
+        job_id: [resume_id for resume_id in resume_ids if (job_id, resume_id) not in fresh]
+        for job_id in job_ids
+    }
+    
+    task_id = f"matrix_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    now = datetime.utcnow()
+    db.session.add(MatchTask(
+        id=task_id,
+        total=len(job_ids) * len(resume_ids),
+        options=json.dumps(options),
+        # 全部复用时任务直接完成
+        status='pending' if any(to_match.values()) else 'completed',
+        finished_at=None if any(to_match.values()) else now
+    ))
+    # 复用的组合作为已结束条目写入，进度和结果查询与新匹配的条目一致
+    db.session.add_all([
+        MatchTaskItem(
+            task_id=task_id, job_description_id=job_id, resume_id=resume_id,
+            status='reused', match_result_id=result_id, finished_at=now, finished_seq=seq
+        )
+        for seq, ((job_id, resume_id), result_id) in enumerate(sorted(fresh.items()), start=1)
+    ])
+    db.session.add_all([
+        MatchTaskItem(task_id=task_id, job_description_id=job_id, resume_id=resume_id)
+        for job_id, resume_id in _schedule_matrix(job_ids, to_match, _claim_size(options))
+    ])
+    db.session.commit()
+    
+    return jsonify({
+        'task_id': task_id,
+        'message': '矩阵匹配任务已开始，请使用任务ID查询进度',
+        'total': len(job_ids) * len(resume_ids),
+        'reused': len(fresh),
+        'to_match': sum(len(pending) for pending in to_match.values())
     }), 202
 
+@app.route('/api/matrix-match/<task_id>', methods=['GET'])
+def get_matrix_progress(task_id):
+    """
+    矩阵匹配的进度：按岗位汇总的条目数，以及每个(岗位, 简历)单元格的状态和得分
+
+    查询参数：job_id（只返回该岗位的单元格），cells=0（不返回单元格）
+    """
+    task = db.session.get(MatchTask, task_id)
+    if not task:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    
+    jobs = {}
+    for job_id, status, count in (
+        db.session.query(MatchTaskItem.job_description_id, MatchTaskItem.status, db.func.count(MatchTaskItem.id))
+        .filter(MatchTaskItem.task_id == task_id)
+        .group_by(MatchTaskItem.job_description_id, MatchTaskItem.status)
+    ):
+        job = jobs.setdefault(job_id, {'job_description_id': job_id, 'total': 0, 'finished': 0, 'counts': {}})
+        job['counts'][status] = count
+        job['total'] += count
+        if status in FINISHED_ITEM_STATUSES:
+            job['finished'] += count
+    titles = dict(db.session.query(JobDescription.id, JobDescription.title).filter(JobDescription.id.in_(jobs)))
+    for job_id, job in jobs.items():
+        job['job_title'] = titles.get(job_id)
+    
+    response = {
+        'task_id': task_id,
+        'status': 'starting' if task.status == 'pending' else task.status,
+        'total': task.total,
+        'counts': _task_status_counts(task_id),
+        'token_usage': _task_token_usage(task_id),
+        'jobs': list(jobs.values())
+    }
+    if request.args.get('cells', '1') != '0':
+        query = (
+            db.session.query(
+                MatchTaskItem.job_description_id, MatchTaskItem.resume_id, MatchTaskItem.status,
+                MatchTaskItem.error, MatchTaskItem.match_result_id, MatchResult.match_score
+            )
+            .outerjoin(MatchResult, MatchResult.id == MatchTaskItem.match_result_id)
+            .filter(MatchTaskItem.task_id == task_id)
+        )
+        if request.args.get('job_id', type=int):
+            query = query.filter(MatchTaskItem.job_description_id == request.args.get('job_id', type=int))
+        response['cells'] = [
+            {
+                'job_description_id': job_id,
+                'resume_id': resume_id,
+                'status': status,
+                'match_result_id': match_result_id,
+                'match_score': match_score,
+                'error': error
+            }
+            for job_id, resume_id, status, error, match_result_id, match_score in query.order_by(
+                MatchTaskItem.job_description_id, MatchTaskItem.resume_id
+            )
+        ]
+    return jsonify(response), 200
+
+def _task_status_counts(task_id):
+    return dict(
+        db.session.query(MatchTaskItem.status, db.func.count(MatchTaskItem.id))
+        .filter(MatchTaskItem.task_id == task_id)
+        .group_by(MatchTaskItem.status)
+        .all()
+    )
+
+def _finished_item_results(task_id, after_seq=0):
+    """按结束顺序返回任务中序号大于after_seq的已结束条目 [(序号, 结果)]"""
+    finished_items = (
+        db.session.query(MatchTaskItem, Resume.filename)
+        .outerjoin(Resume, Resume.id == MatchTaskItem.resume_id)
+        .filter(
+            MatchTaskItem.task_id == task_id,
+            MatchTaskItem.status.in_(FINISHED_ITEM_STATUSES),
+            MatchTaskItem.finished_seq > after_seq
+        )
+        .order_by(MatchTaskItem.finished_seq)
+        .all()
+    )
+    match_records = {
+        record.id: record
+        for record in MatchResult.query.filter(
+            MatchResult.id.in_([item.match_result_id for item, _ in finished_items if item.match_result_id])
+        ).all()
+    }
+    
+    results = []
+    for item, filename in finished_items:
+        result = {
+            'job_description_id': item.job_description_id,
+            'resume_id': item.resume_id,
+            'success': item.status in SUCCESS_ITEM_STATUSES,
+            'resume_filename': filename or f'Unknown (ID: {item.resume_id})'
+        }
+        if item.status == 'reused':
+            result['reused'] = True
+        if item.status in SUCCESS_ITEM_STATUSES and item.match_result_id in match_records:
+            record = match_records[item.match_result_id]
+            result['data'] = _parse_analysis_result(record)
+            result['prompt_tokens'] = record.prompt_tokens
+            result['completion_tokens'] = record.completion_tokens
+        else:
+            result['error'] = item.error or ('已取消' if item.status == 'cancelled' else '匹配失败')
+        results.append((item.finished_seq, result))
+    return results
+
+def _task_token_usage(task_id):
+    """任务已完成条目实际消耗的token总数（命中缓存的条目不计）"""
+    prompt_tokens, completion_tokens = (
+        db.session.query(
+            db.func.coalesce(db.func.sum(MatchResult.prompt_tokens), 0),
+            db.func.coalesce(db.func.sum(MatchResult.completion_tokens), 0)
+        )
+        .join(MatchTaskItem, MatchTaskItem.match_result_id == MatchResult.id)
+        .filter(MatchTaskItem.task_id == task_id, MatchTaskItem.status == 'completed')
+        .one()
+    )
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+
+def _live_progress(task_id):
+    live = match_progress.get(task_id) or {}
+    return live.get('current_filename', ''), live.get('partial_scores', {})
+
 @app.route('/api/match-progress/<task_id>', methods=['GET'])
 def get_match_progress(task_id):
-    """获取匹配进度"""
-    with progress_lock:
-        progress = match_progress.get(task_id)
+    """获取匹配进度（从持久化队列读取，跨进程可见）"""
+    task = db.session.get(MatchTask, task_id)
+    if not task:
+        return jsonify({'error': '任务不存在或已过期'}), 404
     
-    if not progress:
+    results = [result for _, result in _finished_item_results(task_id)]
+    current_filename, partial_scores = _live_progress(task_id)
+    
+    return jsonify({
+        'task_id': task_id,
+        'current': len(results),
+        'total': task.total,
+        'status': 'starting' if task.status == 'pending' else task.status,
+        'error': task.error,
+        'current_filename': current_filename,
+        'counts': _task_status_counts(task_id),
+        'token_usage': _task_token_usage(task_id),
+        'partial_scores': partial_scores,
+        'results': results
+    }), 200
+
+def _sse_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+@app.route('/api/match-progress/<task_id>/stream', methods=['GET'])
+def stream_match_progress(task_id):
+    """
+    以Server-Sent Events推送匹配进度，只发送增量：
+
+    - item：每份简历结束时一条，事件ID为任务内的结束顺序号
+    - status：任务状态、当前处理文件或部分得分变化时发送
+    - summary：任务结束时发送一次，随后关闭连接（取消的任务等正在执行的条目结束后再发送）
+
+    断线重连时浏览器会带上Last-Event-ID（也可通过last_event_id参数指定），从该事件之后继续推送
+    """
+    task = db.session.get(MatchTask, task_id)
+    if not task:
         return jsonify({'error': '任务不存在或已过期'}), 404
     
-    return jsonify(progress), 200
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        last_seq = int(last_event_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid last_event_id'}), 400
+    
+    poll_interval = float(os.getenv('MATCH_STREAM_INTERVAL', 0.5))
+    heartbeat_interval = float(os.getenv('MATCH_STREAM_HEARTBEAT', 15))
+    
+    def generate():
+        seq = last_seq
+        current = db.session.query(db.func.count(MatchTaskItem.id)).filter(
+            MatchTaskItem.task_id == task_id,
+            MatchTaskItem.finished_seq <= seq
+        ).scalar()
+        last_status = None
+        last_sent = time.time()
+        
+        while True:
+            task = db.session.get(MatchTask, task_id)
+            for seq, result in _finished_item_results(task_id, seq):
+                current += 1
+                yield _sse_event('item', dict(result, current=current, total=task.total), seq)
+                last_sent = time.time()
+            
+            current_filename, partial_scores = _live_progress(task_id)
+            status = {
+                'status': 'starting' if task.status == 'pending' else task.status,
+                'current': current,
+                'total': task.total,
+                'current_filename': current_filename,
+                'partial_scores': partial_scores
+            }
+            if status != last_status:
+                yield _sse_event('status', status)
+                last_status = status
+                last_sent = time.time()
+            
+            # 取消后仍在执行的条目会照常保存，等它们都结束后再发送汇总
+            counts = _task_status_counts(task_id) if task.status in ('completed', 'cancelled') else None
+            if counts is not None and not counts.get('processing') and not counts.get('pending'):
+                yield _sse_event('summary', {
+                    'status': task.status,
+                    'total': task.total,
+                    'completed': counts.get('completed', 0),
+                    'reused': counts.get('reused', 0),
+                    'failed': counts.get('failed', 0),
+                    'cancelled': counts.get('cancelled', 0),
+                    'token_usage': _task_token_usage(task_id),
+                    'error': task.error
+                })
+                return
+            
+            if time.time() - last_sent >= heartbeat_interval:
+                # 注释行作为心跳，防止代理因空闲关闭连接
+                yield ': keep-alive\n\n'
+                last_sent = time.time()
+            
+            # 结束本轮的读事务并清空会话缓存，下一轮读取最新状态
+            db.session.rollback()
+            db.session.expire_all()
+            time.sleep(poll_interval)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/match-tasks', methods=['GET'])
+def get_match_tasks():
+    """列出最近的批量匹配任务"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    tasks = MatchTask.query.order_by(MatchTask.created_at.desc()).limit(limit).all()
+    return jsonify([dict(task.to_dict(), counts=_task_status_counts(task.id)) for task in tasks]), 200
+
+@app.route('/api/match-tasks/<task_id>/cancel', methods=['POST'])
+def cancel_match_task(task_id):
+    """取消任务：尚未开始的条目不再执行，正在执行的条目完成后照常保存"""
+    task = MatchTask.query.get_or_404(task_id)
+    if task.status in ('completed', 'cancelled'):
+        return jsonify({'error': f'任务已{"完成" if task.status == "completed" else "取消"}'}), 400
+    
+    now = datetime.utcnow()
+    cancelled = _cancel_match_items(task_id, MatchTaskItem.status == 'pending', now)
+    task.status = 'cancelled'
+    task.finished_at = now
+    db.session.commit()
+    match_progress.finish(task_id)
+    return jsonify({'message': f'任务已取消，{cancelled} 份简历未执行', 'cancelled': cancelled}), 200
+
+@app.route('/api/llm-providers', methods=['GET'])
+def get_llm_providers():
+    """列出可用的LLM服务提供方"""
+    return jsonify(describe_providers()), 200
+
+@app.route('/api/match-cache/stats', methods=['GET'])
+def get_match_cache_stats():
+    """获取匹配缓存统计，in_flight 为进行中请求的合并统计（shared 为等待并共享结果的重复请求数）"""
+    return jsonify(dict(match_cache.stats(), in_flight=match_flights.stats())), 200
+
+@app.route('/api/task-registry/stats', methods=['GET'])
+def get_task_registry_stats():
+    """获取进程内进度登记表的存活任务数和淘汰数"""
+    return jsonify({
+        'match': match_progress.stats(),
+        'ingest': ingest_progress.stats()
+    }), 200
+
+@app.route('/api/match-cache', methods=['DELETE'])
+def clear_match_cache():
+    """清空匹配缓存"""
+    match_cache.clear()
+    return jsonify({'message': '匹配缓存已清空'}), 200
 
-@app.route('/api/resume/pdf/<filename>', methods=['GET'])
-def get_resume_pdf(filename):
-    """获取简历PDF文件"""
+@app.route('/api/resumes/<int:id>/pdf', methods=['GET'])
+def get_resume_pdf(id):
+    """获取简历PDF文件（按简历ID查找，同名的不同文件各自对应自己的PDF）"""
     try:
-        # 查找数据库中是否有该文件名的简历记录
-        resume = Resume.query.filter_by(filename=filename).first()
+        resume = db.session.query(Resume.id, Resume.filename, Resume.file_hash).filter(Resume.id == id).first()
         if not resume:
             return jsonify({'error': '简历文件不存在'}), 404
         
-        # 假设PDF文件存储在uploads目录下
-        upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-        file_path = os.path.join(upload_dir, filename)
+        file_path = _resume_file_path(resume)
         
         # 检查文件是否存在
         if not os.path.exists(file_path):
             return jsonify({'error': 'PDF文件不存在'}), 404
         
         # 返回PDF文件
-        return send_file(file_path, as_attachment=False, mimetype='application/pdf')
+        return send_file(file_path, as_attachment=False, mimetype='application/pdf', download_name=resume.filename)
     except Exception as e:
         return jsonify({'error': f'获取PDF文件失败: {str(e)}'}), 500
 
 if __name__ == '__main__':
+    # app.run(debug=True)会启动重载器，只在实际提供服务的子进程中启动内置worker
+    if os.getenv('MATCH_EMBEDDED_WORKER', '1') == '1' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_embedded_match_worker()
     app.run(debug=True, port=5000)
\ No newline at end of file
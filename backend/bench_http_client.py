@@ -0,0 +1,85 @@
+"""
+本地桩服务器压测：对比每次新建连接的 requests.post 与共享连接池的 HTTPClient
+
+用法：python bench_http_client.py [--requests 200] [--concurrency 8] [--latency 0.0]
+"""
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from services.http_client import HTTPClient
+
+RESPONSE_BODY = json.dumps({
+    'choices': [{'message': {'content': '{"total_score": 80}'}}]
+}).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟chat completions接口，支持keep-alive"""
+    protocol_version = 'HTTP/1.1'
+    # 关闭Nagle算法，避免keep-alive连接上头部与正文分段发送触发延迟ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+    connections = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        with StubHandler.lock:
+            StubHandler.connections.add(self.client_address)
+        if StubHandler.latency:
+            time.sleep(StubHandler.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, post, url, total, concurrency):
+    StubHandler.connections = set()
+    payload = {'model': 'stub', 'messages': [{'role': 'user', 'content': '简历' * 500}]}
+
+    def call(_):
+        start = time.perf_counter()
+        response = post(url, json=payload)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'{label:<18} 总耗时 {elapsed:7.3f}s  吞吐 {total / elapsed:8.1f} req/s  '
+          f'p50 {p50:6.2f}ms  p99 {p99:6.2f}ms  TCP连接数 {len(StubHandler.connections)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='桩服务器每个请求的模拟延迟（秒）')
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/v1/chat/completions'
+
+    client = HTTPClient(pool_size=args.concurrency)
+    run('requests.post', lambda u, **kw: requests.post(u, timeout=30, **kw), url, args.requests, args.concurrency)
+    run('HTTPClient.post', client.post, url, args.requests, args.concurrency)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+PDFParser 微基准：对 1~50 页的合成简历测量解析吞吐（页/秒）和峰值内存
+
+用法：python bench_pdf_parser.py [--pages 1 5 10 25 50] [--repeat 5]
+"""
+import io
+import time
+import argparse
+import tracemalloc
+from services.pdf_parser import PDFParser
+
+SAMPLE_LINES = [
+    'Education. Tsinghua University, Computer Science, 2012 - 2016',
+    'Experience. Senior Backend Engineer at Example Corp, 2016 - 2023',
+    'Built distributed matching services in Python, Flask and SQLAlchemy',
+    'Projects. Resume screening platform with LLM based scoring',
+    'Skills. Python, Go, Kubernetes, PostgreSQL, Redis, Kafka',
+    'Summary. Strong ownership, clear communication, mentoring juniors',
+]
+
+
+def build_pdf(page_count, lines_per_page=45):
+    """生成只包含Helvetica文本的最小PDF，不依赖额外的PDF生成库"""
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join(f'{4 + 2 * i} 0 R' for i in range(page_count)), page_count),
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i in range(page_count):
+        lines = [SAMPLE_LINES[(i + j) % len(SAMPLE_LINES)] for j in range(lines_per_page)]
+        stream = 'BT /F1 9 Tf 40 760 Td 11 TL ' + ' '.join(f'({line}) Tj T*' for line in lines) + ' ET'
+        objects.append(
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>'
+        )
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+
+    parts = ['%PDF-1.4\n']
+    offsets = []
+    size = len(parts[0])
+    for number, body in enumerate(objects, start=1):
+        offsets.append(size)
+        chunk = f'{number} 0 obj\n{body}\nendobj\n'
+        parts.append(chunk)
+        size += len(chunk)
+    parts.append(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n')
+    parts.extend(f'{offset:010d} 00000 n \n' for offset in offsets)
+    parts.append(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{size}\n%%EOF\n')
+    return ''.join(parts).encode('latin-1')
+
+
+def measure(label, func, payload, pages, repeat):
+    func(payload)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{label:<14} {pages:>4} 页  {pages * repeat / elapsed:10.1f} 页/秒  峰值内存 {peak / 1024:9.1f} KB')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        pdf_bytes = build_pdf(pages)
+        raw_text = ''.join(page_text + '\n' for page_text in PDFParser.iter_pages(io.BytesIO(pdf_bytes)))
+        measure('parse_pdf', lambda data: PDFParser.parse_pdf(io.BytesIO(data)), pdf_bytes, pages, args.repeat)
+        measure('iter_pages', lambda data: sum(1 for _ in PDFParser.iter_pages(io.BytesIO(data))), pdf_bytes, pages, args.repeat)
+        measure('_clean_text', PDFParser._clean_text, raw_text, pages, args.repeat * 20)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+简历全文搜索基准：在临时SQLite库中生成合成简历，测量建索引耗时和 /api/resumes/search 所用查询的延迟
+
+用法：python bench_resume_search.py [--resumes 100000] [--queries 200]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from sqlalchemy import create_engine, text
+from services import resume_search
+
+SKILLS = ['Python', 'Java', 'Go', 'Kubernetes', 'Docker', 'Redis', 'Kafka', 'PostgreSQL', 'React', 'Vue',
+          'C++', 'Spark', 'Flink', 'TensorFlow', 'PyTorch', 'Linux', 'Nginx', 'Elasticsearch']
+PHRASES = ['负责分布式系统设计与开发', '参与推荐算法优化', '主导微服务架构改造', '搭建数据仓库和实时计算平台',
+           '带领团队完成性能优化', '熟悉高并发场景下的系统调优', '具有良好的沟通能力和团队合作精神',
+           '本科毕业于计算机科学与技术专业', '硕士研究生，研究方向为机器学习']
+QUERIES = ['kubernetes', 'python kafka', '分布式', '推荐算法', '数据仓库 spark', '机器学习 pytorch', 'c++ linux']
+
+
+def build_resume(rng):
+    skills = ' '.join(rng.sample(SKILLS, 5))
+    phrases = '。'.join(rng.sample(PHRASES, 4))
+    return f'专业技能 {skills}\n\n工作经历 {phrases}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resumes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE resume (id INTEGER PRIMARY KEY, filename TEXT, content TEXT)'))
+        connection.execute(text(resume_search.CREATE_INDEX_SQL))
+
+    start = time.perf_counter()
+    batch = []
+    with engine.begin() as connection:
+        for resume_id in range(1, args.resumes + 1):
+            batch.append((resume_id, f'resume_{resume_id}.pdf', build_resume(rng)))
+            if len(batch) == 1000:
+                resume_search.index_resumes(connection, batch)
+                batch = []
+        resume_search.index_resumes(connection, batch)
+    print(f'建立索引 {args.resumes} 份简历: {time.perf_counter() - start:.2f}s')
+
+    with engine.connect() as connection:
+        for query in QUERIES:
+            latencies = []
+            for _ in range(args.queries // len(QUERIES) or 1):
+                begin = time.perf_counter()
+                total, hits = resume_search.search(connection, query, limit=20)
+                latencies.append(time.perf_counter() - begin)
+            latencies.sort()
+            print(f'{query:<16} 命中 {total:>7}  p50 {latencies[len(latencies) // 2] * 1000:7.2f}ms  '
+                  f'max {latencies[-1] * 1000:7.2f}ms')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
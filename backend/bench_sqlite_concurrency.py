@@ -0,0 +1,108 @@
+"""
+SQLite读写并发基准：模拟批量匹配worker逐条写入匹配结果的同时，列表/进度接口持续读取
+
+对比默认配置（回滚日志、synchronous=FULL）与 db_config 中的WAL和PRAGMA配置
+用法：python bench_sqlite_concurrency.py [--writers 4] [--readers 8] [--seconds 5]
+"""
+import os
+import time
+import argparse
+import tempfile
+import threading
+from sqlalchemy import create_engine, text
+import db_config
+
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 30000}
+
+
+def setup(path, pragmas, rows):
+    engine = create_engine(f'sqlite:///{path}', **db_config.engine_options())
+    db_config.register_pragmas(engine, pragmas)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE match_result (id INTEGER PRIMARY KEY, job_description_id INTEGER, resume_id INTEGER, '
+            'match_score FLOAT, analysis_result TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)'
+        ))
+        connection.execute(
+            text('INSERT INTO match_result (job_description_id, resume_id, match_score, analysis_result) '
+                 'VALUES (:job, :resume, :score, :analysis)'),
+            [{'job': i % 20, 'resume': i, 'score': i % 100, 'analysis': '{}' * 200} for i in range(rows)]
+        )
+        for name, table, column in db_config.INDEXES:
+            if table == 'match_result':
+                connection.execute(text(f'CREATE INDEX {name} ON {table} ({column})'))
+    return engine
+
+
+def run(label, pragmas, args):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = setup(path, pragmas, args.rows)
+    stop = threading.Event()
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    read_latencies = []
+    lock = threading.Lock()
+
+    def writer(worker):
+        n = 0
+        while not stop.is_set():
+            try:
+                # 与worker一致：每份简历单独提交
+                with engine.begin() as connection:
+                    connection.execute(
+                        text('INSERT INTO match_result (job_description_id, resume_id, match_score, analysis_result) '
+                             'VALUES (:job, :resume, :score, :analysis)'),
+                        {'job': worker, 'resume': n, 'score': n % 100, 'analysis': '{}' * 200}
+                    )
+                n += 1
+                with lock:
+                    counts['writes'] += 1
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+
+    def reader(worker):
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text(
+                        'SELECT id, match_score FROM match_result WHERE job_description_id = :job '
+                        'ORDER BY created_at DESC LIMIT 50'
+                    ), {'job': worker % 20}).fetchall()
+                with lock:
+                    counts['reads'] += 1
+                    read_latencies.append(time.perf_counter() - start)
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    read_latencies.sort()
+    p99 = read_latencies[int(len(read_latencies) * 0.99) - 1] * 1000 if read_latencies else 0
+    print(f'{label:<10} 写入 {counts["writes"] / args.seconds:8.1f} 次/秒  读取 {counts["reads"] / args.seconds:8.1f} 次/秒  '
+          f'读p99 {p99:7.2f}ms  错误 {counts["errors"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=20000, help='预先写入的匹配结果行数')
+    args = parser.parse_args()
+
+    run('default', DEFAULT_PRAGMAS, args)
+    run('tuned', db_config.SQLITE_PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
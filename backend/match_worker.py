@@ -0,0 +1,40 @@
+"""
+独立的批量匹配worker进程：从数据库队列领取匹配条目并逐条提交结果
+
+同一台机器上可以启动多个进程横向扩展吞吐；进程崩溃或重启后，未完成条目在租约过期后会被重新领取
+用法：python match_worker.py [--workers 1]
+"""
+import signal
+import argparse
+import threading
+from app import run_match_worker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1, help='本进程内的worker线程数')
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+
+    def shutdown(signum, frame):
+        # 正在处理的批次完成后退出，未领取的条目留在队列中
+        print('收到退出信号，等待当前批次完成...')
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [
+        threading.Thread(target=run_match_worker, kwargs={'stop_event': stop_event}, name=f'match-worker-{i}')
+        for i in range(args.workers)
+    ]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+if __name__ == '__main__':
+    main()
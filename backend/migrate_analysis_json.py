@@ -0,0 +1,65 @@
+"""
+一次性迁移：把以Python repr格式存储的analysis_result转换为JSON，并补齐维度得分子表
+
+可以重复执行，已是JSON且已有维度得分的记录会被跳过
+用法：python migrate_analysis_json.py
+"""
+import ast
+import json
+from app import app, db, MatchResult, MatchDimensionScore, extract_dimension_scores
+
+BATCH_SIZE = 500
+
+with app.app_context():
+    converted = 0
+    indexed = 0
+    failed = 0
+    last_id = 0
+
+    while True:
+        results = (
+            MatchResult.query
+            .filter(MatchResult.id > last_id)
+            .order_by(MatchResult.id)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not results:
+            break
+        last_id = results[-1].id
+
+        indexed_ids = {
+            match_result_id for (match_result_id,) in
+            db.session.query(MatchDimensionScore.match_result_id)
+            .filter(MatchDimensionScore.match_result_id.in_([result.id for result in results]))
+            .distinct()
+        }
+
+        for result in results:
+            try:
+                analysis_data = json.loads(result.analysis_result)
+            except json.JSONDecodeError:
+                try:
+                    analysis_data = ast.literal_eval(result.analysis_result)
+                except (ValueError, SyntaxError):
+                    failed += 1
+                    print(f'ID {result.id} 的分析结果无法解析，已跳过')
+                    continue
+                result.analysis_result = json.dumps(analysis_data, ensure_ascii=False)
+                converted += 1
+
+            if result.id not in indexed_ids and isinstance(analysis_data, dict):
+                for dimension, score in extract_dimension_scores(analysis_data):
+                    db.session.add(MatchDimensionScore(
+                        match_result_id=result.id,
+                        job_description_id=result.job_description_id,
+                        resume_id=result.resume_id,
+                        dimension=dimension,
+                        score=score
+                    ))
+                indexed += 1
+
+        db.session.commit()
+        print(f'已处理到ID {last_id}')
+
+    print(f'转换为JSON: {converted} 条，补齐维度得分: {indexed} 条，解析失败: {failed} 条')
@@ -0,0 +1,174 @@
+"""
+本地LLM替身服务：实现OpenAI兼容的 /v1/chat/completions 接口，用于离线压测并发、重试和缓存
+
+- 按提示词内容确定性地生成评分结果（同一简历多次请求得分一致），支持流式输出和多简历打包请求
+- 可注入响应延迟、5xx错误率和429限流比例
+
+用法：python mock_llm_server.py [--port 8001] [--latency 1.0] [--jitter 0.5] [--error-rate 0.05] [--rate-limit 0.05]
+然后设置 LLM_PROVIDER=local（或在岗位/批量匹配中指定 provider=local）
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services.token_counter import estimate_tokens
+
+DIMENSIONS = ['职位职能', '学历要求', '专业要求', '工作年限', '专业技能']
+_RESUME_ID_PATTERN = re.compile(r'## 简历ID: (\S+)')
+
+
+def build_result(seed_text):
+    """根据文本哈希生成稳定的评分结果"""
+    rng = random.Random(hashlib.sha256(seed_text.encode('utf-8')).hexdigest())
+    scores = {dimension: rng.randint(40, 98) for dimension in DIMENSIONS}
+    return {
+        'dimension_scores': {
+            dimension: {'score': score, 'reason': f'{dimension}模拟评估', 'suggestion': '无'}
+            for dimension, score in scores.items()
+        },
+        'total_score': round(sum(scores.values()) / len(scores), 1),
+        'overall_assessment': '本地模拟服务生成的评估结果',
+        'improvement_suggestions': ['模拟建议']
+    }
+
+
+def build_content(prompt):
+    """单份简历返回一个JSON对象，打包请求返回带resume_id的JSON数组"""
+    resume_ids = _RESUME_ID_PATTERN.findall(prompt)
+    if not resume_ids:
+        return '```json\n' + json.dumps(build_result(prompt), ensure_ascii=False) + '\n```'
+    blocks = _RESUME_ID_PATTERN.split(prompt)[1:]
+    items = []
+    for resume_id, block in zip(blocks[0::2], blocks[1::2]):
+        items.append(dict(build_result(block), resume_id=resume_id))
+    return '```json\n' + json.dumps(items, ensure_ascii=False) + '\n```'
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    latency = 1.0
+    jitter = 0.5
+    error_rate = 0.0
+    rate_limit = 0.0
+    stream_chunk_delay = 0.01
+    stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+    stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with MockLLMHandler.stats_lock:
+            MockLLMHandler.stats[key] += 1
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send_json(200, {'data': [{'id': 'local-model', 'object': 'model'}]})
+        elif self.path.rstrip('/') == '/stats':
+            with MockLLMHandler.stats_lock:
+                self._send_json(200, dict(MockLLMHandler.stats))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self._count('requests')
+
+        roll = random.random()
+        if roll < MockLLMHandler.rate_limit:
+            self._count('rate_limited')
+            self._send_json(429, {'error': {'message': 'rate limited'}}, {'Retry-After': '1'})
+            return
+        if roll < MockLLMHandler.rate_limit + MockLLMHandler.error_rate:
+            self._count('errors')
+            self._send_json(500, {'error': {'message': 'injected error'}})
+            return
+
+        time.sleep(max(0.0, random.uniform(MockLLMHandler.latency - MockLLMHandler.jitter,
+                                           MockLLMHandler.latency + MockLLMHandler.jitter)))
+        prompt = ''.join(message.get('content', '') for message in body.get('messages', []))
+        content = build_content(prompt)
+        usage = {
+            'prompt_tokens': estimate_tokens(prompt),
+            'completion_tokens': estimate_tokens(content),
+        }
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+
+        if body.get('stream'):
+            self._stream(content, usage)
+        else:
+            self._send_json(200, {
+                'id': 'mock-' + hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12],
+                'object': 'chat.completion',
+                'model': body.get('model', 'local-model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+    def _stream(self, content, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write(data):
+            chunk = data.encode('utf-8')
+            self.wfile.write(f'{len(chunk):x}\r\n'.encode('ascii') + chunk + b'\r\n')
+
+        for i in range(0, len(content), 16):
+            delta = {'choices': [{'index': 0, 'delta': {'content': content[i:i + 16]}}]}
+            write('data: ' + json.dumps(delta, ensure_ascii=False) + '\n\n')
+            time.sleep(MockLLMHandler.stream_chunk_delay)
+        write('data: ' + json.dumps({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'usage': usage}) + '\n\n')
+        write('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, **settings):
+    """在后台线程中启动服务，返回 (server, chat completions地址)；供压测脚本直接调用"""
+    for name, value in settings.items():
+        setattr(MockLLMHandler, name, value)
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockLLMHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1/chat/completions'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=1.0, help='平均响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.5, help='延迟的随机波动范围（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500的请求比例')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='返回429的请求比例')
+    args = parser.parse_args()
+
+    server, url = start_server(
+        args.port, latency=args.latency, jitter=min(args.jitter, args.latency),
+        error_rate=args.error_rate, rate_limit=args.rate_limit
+    )
+    print(f'本地LLM替身服务已启动: {url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+解析器升级后的增量回填：用当前版本的PDFParser重新解析parser_version过期的简历
+
+只处理过期的记录，PDF从uploads目录读取并在进程池中并行解析，结果按批写回数据库和全文索引；
+按文件名存储的旧简历会先补齐文件哈希（file_hash），之后重复上传同一文件能被识别；
+可以重复执行，中断后再次运行会从剩余的过期记录继续
+用法：python reparse_resumes.py [--batch-size 50] [--dry-run]
+"""
+import argparse
+from app import app, Resume, PDFParser, run_reparse, _outdated_resume_filter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=None, help='每批解析和写入的简历数（默认INGEST_BATCH_SIZE）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计需要重新解析的简历数')
+    args = parser.parse_args()
+
+    with app.app_context():
+        outdated = Resume.query.filter(_outdated_resume_filter()).count()
+    print(f'当前解析器版本: {PDFParser.VERSION}，需要重新解析的简历: {outdated} 份')
+    if args.dry_run or not outdated:
+        return
+
+    def on_batch(stats):
+        print(f"已处理 {stats['processed']}/{outdated}，重新解析 {stats['reparsed']} 份")
+
+    stats = run_reparse(batch_size=args.batch_size, on_batch=on_batch)
+    print(f"补齐文件哈希: {stats['hashed']} 份")
+    print(f"重新解析: {stats['reparsed']} 份，文件缺失: {stats['missing']} 份，解析失败: {stats['failed']} 份")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class LLMUnavailableError(Exception):
+    """
+    LLM服务暂时不可用（限流、5xx、网络错误或熔断），调用方应把条目放回队列稍后重试，而不是保存模拟结果
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """熔断器处于打开状态，请求没有发出"""
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开熔断器，在open_seconds内拒绝所有请求；
+    到期后进入半开状态只放行一个探测请求，成功则关闭，失败则重新打开并加倍等待时间
+    """
+
+    def __init__(self, failure_threshold=None, open_seconds=None, max_open_seconds=None):
+        self.failure_threshold = int(failure_threshold or os.getenv('LLM_CIRCUIT_FAILURE_THRESHOLD', 8))
+        self.open_seconds = float(open_seconds or os.getenv('LLM_CIRCUIT_OPEN_SECONDS', 30))
+        self.max_open_seconds = float(max_open_seconds or os.getenv('LLM_CIRCUIT_MAX_OPEN_SECONDS', 300))
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = self.open_seconds
+        self._probe_in_flight = False
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self, open_for):
+        self.state = 'open'
+        self._opened_at = time.monotonic()
+        self._open_for = open_for
+        self._probe_in_flight = False
+        self._opened += 1
+
+    def remaining(self):
+        """熔断器打开时距离半开还有多少秒，否则为0"""
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self._opened_at + self._open_for - time.monotonic())
+
+    def before_call(self):
+        """请求发出前调用，熔断器打开（或半开且已有探测请求）时抛出CircuitOpenError"""
+        with self._lock:
+            if self.state == 'open':
+                remaining = self._opened_at + self._open_for - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError('LLM服务熔断中，暂停发送请求', retry_after=remaining)
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._probe_in_flight:
+                    raise CircuitOpenError('LLM服务熔断恢复中，等待探测请求结果', retry_after=1.0)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != 'closed':
+                print('LLM服务恢复，熔断器关闭')
+            self.state = 'closed'
+            self._open_for = self.open_seconds
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open':
+                self._open(min(self._open_for * 2, self.max_open_seconds))
+                print(f'探测请求失败，熔断器重新打开 {self._open_for:.0f} 秒')
+            elif self.state == 'closed' and self._failures >= self.failure_threshold:
+                self._open(self.open_seconds)
+                print(f'连续 {self._failures} 次请求失败，熔断器打开 {self._open_for:.0f} 秒')
+
+    def record_ignored(self):
+        """与服务健康无关的结果（例如4xx参数错误），只释放探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self._failures,
+                'opened': self._opened
+            }
+
+
+class AdaptiveLimiter:
+    """
+    单个LLM服务提供方的自适应并发控制（AIMD）和熔断
+
+    - 请求成功且延迟正常时，并发上限每轮约加1（每次成功加 1/上限）
+    - 遇到429、5xx、网络错误，或平均延迟超过基线（近期延迟的10%分位）的 latency_tolerance 倍时，上限乘以backoff
+    - 两次减小之间至少间隔一个平均延迟，避免同一批在途请求的失败把上限连续压到最低
+    """
+
+    def __init__(self, name, initial=None, min_limit=None, max_limit=None, backoff=None, latency_tolerance=None):
+        self.name = name
+        self.min_limit = max(1, int(min_limit or os.getenv('LLM_MIN_CONCURRENCY', 1)))
+        self.max_limit = max(self.min_limit, int(max_limit or os.getenv('LLM_MAX_CONCURRENCY', 64)))
+        self.limit = float(min(max(int(initial or os.getenv('LLM_INITIAL_CONCURRENCY', 4)), self.min_limit), self.max_limit))
+        self.backoff = float(backoff or os.getenv('LLM_CONCURRENCY_BACKOFF', 0.5))
+        self.latency_tolerance = float(latency_tolerance or os.getenv('LLM_LATENCY_TOLERANCE', 3.0))
+        self.breaker = CircuitBreaker()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=100)
+        self._avg_latency = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        # 等待名额的协程：(事件循环, future)，名额释放或上限变化时在各自的事件循环中唤醒
+        self._async_waiters = []
+        self._counts = {'success': 0, 'throttled': 0, 'error': 0, 'rejected': 0}
+
+    def _take_slot(self):
+        """在持有锁时调用：有空闲名额时占用并返回True"""
+        if self._in_flight < max(self.min_limit, int(self.limit)):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _notify(self):
+        """在持有锁时调用：唤醒等待名额的线程和协程"""
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+        self._async_waiters.clear()
+
+    def _check_breaker(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.release()
+            with self._condition:
+                self._counts['rejected'] += 1
+            raise
+
+    def acquire(self):
+        """阻塞直到有空闲的并发名额；熔断时释放名额并抛出CircuitOpenError"""
+        with self._condition:
+            while not self._take_slot():
+                self._condition.wait()
+        self._check_breaker()
+
+    async def acquire_async(self):
+        """acquire的协程版本，等待名额释放或上限变化的通知，等待期间不占用事件循环"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._take_slot():
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+        self._check_breaker()
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._notify()
+
+    def _baseline_latency(self):
+        latencies = sorted(self._latencies)
+        return latencies[len(latencies) // 10]
+
+    def _decrease(self, now):
+        cooldown = max(self._avg_latency or 1.0, 1.0)
+        if now - self._last_decrease >= cooldown:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+            self._last_decrease = now
+
+    def observe(self, status, latency):
+        """
+        记录一次HTTP尝试的结果：status为HTTP状态码，网络错误或超时为None
+        """
+        now = time.monotonic()
+        if status is not None and 400 <= status < 500 and status != 429:
+            self.breaker.record_ignored()
+            return
+        with self._condition:
+            if status is not None and status < 400:
+                self._counts['success'] += 1
+                self._latencies.append(latency)
+                self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+                if len(self._latencies) >= 10 and self._avg_latency > self._baseline_latency() * self.latency_tolerance:
+                    self._decrease(now)
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            else:
+                self._counts['throttled' if status == 429 else 'error'] += 1
+                self._decrease(now)
+            self._notify()
+        if status is not None and status < 400:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def stats(self):
+        with self._condition:
+            stats = dict(
+                self._counts,
+                limit=round(self.limit, 2),
+                in_flight=self._in_flight,
+                avg_latency=round(self._avg_latency, 3) if self._avg_latency is not None else None,
+                baseline_latency=round(self._baseline_latency(), 3) if self._latencies else None
+            )
+        stats['circuit'] = self.breaker.stats()
+        return stats
@@ -1,20 +1,107 @@
 import os
+import re
 import json
+import time
+import asyncio
+import inspect
+import aiohttp
 import requests
 from dotenv import load_dotenv
+from .http_client import get_http_client, RETRY_STATUS_CODES
+from .token_counter import estimate_tokens
+from .prompt_builder import compress_resume, compress_job_description
+from .adaptive_limiter import AdaptiveLimiter, LLMUnavailableError
+from .json_repair import parse_json, normalize_match_result, IncrementalJSONParser, InvalidResultError
 
 load_dotenv()
 
+# 打包模式下每份简历预留的输出token数，以及单次请求的输出上限
+_PACKED_OUTPUT_TOKENS_PER_RESUME = 600
+_MAX_OUTPUT_TOKENS = 8000
+
+_RESULT_EXAMPLE = """
+        {
+            "dimension_scores": {
+                "职位职能": {"score": 85, "reason": "简历中的工作经历与岗位职能高度相关", "suggestion": "可以进一步突出相关项目经验"},
+                "学历要求": {"score": 90, "reason": "学历符合岗位要求", "suggestion": "无"},
+                "专业要求": {"score": 80, "reason": "专业背景基本匹配", "suggestion": "可以补充相关专业课程"},
+                "工作年限": {"score": 75, "reason": "工作经验略低于要求", "suggestion": "突出项目经验和技能成长"},
+                "专业技能": {"score": 88, "reason": "具备岗位所需的核心技能", "suggestion": "可以增加具体技术栈的深度描述"}
+            },
+            "total_score": 83.6,
+            "overall_assessment": "简历与岗位匹配度良好，具备较强的竞争力",
+            "improvement_suggestions": [
+                "增加相关项目经验的详细描述",
+                "突出技术栈的深度和广度",
+                "量化工作成果和贡献"
+            ]
+        }
+        """
+
+_SCORING_INSTRUCTIONS = """- 根据岗位描述获取该岗位需要以下哪些任职要求：职位职能,学历要求,专业要求,工作年限,学校要求,任职公司要求,专业技能要求,软性技能要求,加分技能要求,语言要求,证书,性别要求,年龄要求,管理能力要求,职能经验要求,行业经验要求。
+- 根据获取到的岗位任职要求和简历信息作多维度细化分析，岗位介绍中没有提及的任职要求对简历不做要求，计算得出简历和岗位涉及到任职要求的匹配度。
+- 整理并逐条以json的格式返回下面信息：各维度匹配得分、打分原因、修改建议、匹配度总分(总分为100%)。不返回岗位任职要求。
+"""
+
+# 修正请求只需要重新输出JSON，输出上限按单份结果设置
+_REASK_MAX_OUTPUT_TOKENS = 1500
+
+# 流式输出中识别 "维度": {"score": 85 和 "total_score": 83.6
+# 数字后必须已经出现分隔符，避免把被截断的 "8" 当作 "85"
+_DIMENSION_SCORE_PATTERN = re.compile(r'"([^"]+)"\s*:\s*\{\s*"score"\s*:\s*(\d+(?:\.\d+)?)(?=\s*[,}])')
+_TOTAL_SCORE_PATTERN = re.compile(r'"total_score"\s*:\s*(\d+(?:\.\d+)?)(?=\s*[,}])')
+
+
+def _is_match_result(value):
+    return not normalize_match_result(value)[1]
+
+
+def _is_packed_results(value):
+    """打包返回的结果数组（或包含results的对象），空数组通常来自正文前 "[注意]" 之类的说明"""
+    if isinstance(value, dict):
+        value = value.get('results')
+    return isinstance(value, list) and any(isinstance(item, dict) for item in value)
+
+
+class _RetryableStatus(Exception):
+    """异步请求返回可重试的状态码"""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
 class DeepSeekService:
-    def __init__(self):
-        self.api_key = os.getenv('DEEPSEEK_API_KEY')
-        self.base_url = "https://api.deepseek.com/v1/chat/completions"
+    """
+    OpenAI兼容的chat completions客户端，默认连接DeepSeek
+
+    其他服务提供方（OpenAI兼容服务、本地模型）通过 llm_providers.get_llm_provider 以不同参数创建
+    """
+    # 修改提示词模板时递增，使旧的缓存结果失效
+    PROMPT_VERSION = 2
+
+    def __init__(self, name='deepseek', base_url=None, api_key=None, model=None, requires_api_key=True):
+        self.name = name
+        self.api_key = api_key if api_key is not None else os.getenv('DEEPSEEK_API_KEY')
+        self.base_url = base_url or "https://api.deepseek.com/v1/chat/completions"
+        self.model = model or "deepseek-chat"
+        self.requires_api_key = requires_api_key
+        # 单份简历分析的输出token上限
+        self.max_output_tokens = int(os.getenv('MATCH_MAX_OUTPUT_TOKENS', 2000))
+        # 返回内容修复后仍不完整时，是否把原输出发回模型要求修正（否则直接判定失败）
+        self.json_reask = os.getenv('MATCH_JSON_REASK', '1') == '1'
+        self.http_client = get_http_client()
+        # 按该服务的延迟和429/5xx自适应调整并发，连续失败时熔断
+        self.limiter = AdaptiveLimiter(name)
         
     def analyze_match(self, job_description, resume_content):
         """
         分析岗位描述和简历的匹配度
+
+        服务限流、出错或熔断时抛出LLMUnavailableError，由调用方放回队列重试（不再返回模拟数据）；
+        返回内容修复和修正后仍无法得到有效结果时抛出InvalidResultError（不再保存0分的默认结果）
         """
-        if not self.api_key or self.api_key == 'your_deepseek_api_key_here':
+        if not self._has_api_key():
             # 如果没有配置API密钥，返回模拟数据
             print("使用模拟数据（API密钥未配置或为默认值）")
             return self._get_mock_result(job_description, resume_content)
@@ -22,108 +109,458 @@ class DeepSeekService:
 
         prompt = self._build_prompt(job_description, resume_content)
         
+        self.limiter.acquire()
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+            headers = self._build_headers()
+            data = self._build_request_data(prompt)
             
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3,
-                "max_tokens": 2000
-            }
-            
-            print(f"调用DeepSeek API，请求数据长度: {len(prompt)} 字符")
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=120)
+            print(f"调用{self.name} API（{self.model}），请求数据长度: {len(prompt)} 字符")
+            response = self.http_client.post(self.base_url, headers=headers, json=data, observer=self.limiter.observe)
+            if response.status_code in RETRY_STATUS_CODES:
+                raise LLMUnavailableError(
+                    f"{self.name} API返回 {response.status_code}，重试次数已用尽",
+                    retry_after=self.http_client._backoff(self.http_client.max_retries, response)
+                )
             response.raise_for_status()
             
             result = response.json()
             content = result['choices'][0]['message']['content']
             
-            print(f"DeepSeek API调用成功，返回内容长度: {len(content)} 字符")
-            
-            # 解析返回的JSON内容
-            parsed_result = self._parse_response(content)
-            print(f"解析结果: {parsed_result.get('total_score', 0)}分")
-            return parsed_result
+            print(f"{self.name} API调用成功，返回内容长度: {len(content)} 字符")
             
         except requests.exceptions.RequestException as e:
-            print(f"DeepSeek API网络请求失败: {e}")
+            print(f"{self.name} API网络请求失败: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 print(f"响应状态码: {e.response.status_code}")
                 print(f"响应内容: {e.response.text}")
+            raise LLMUnavailableError(f"{self.name} API网络请求失败: {e}") from e
+        finally:
+            self.limiter.release()
+        
+        # 解析返回的JSON内容，修复后仍不完整时请求模型修正
+        token_usage = self._token_usage(result.get('usage'), prompt, content)
+        parsed_result, errors = self._parse_result(content)
+        if errors:
+            parsed_result, reask_usage = self._reask(content, errors)
+            token_usage = self._merge_token_usage(token_usage, reask_usage)
+        parsed_result['token_usage'] = token_usage
+        print(f"解析结果: {parsed_result['total_score']}分")
+        return parsed_result
+    
+    async def analyze_match_async(self, job_description, resume_content, session=None, on_partial=None):
+        """
+        异步分析岗位描述和简历的匹配度，使用流式输出
+
+        on_partial: 可选回调，每当流式内容中解析出新的维度得分或总分时调用，参数为部分得分字典
+        """
+        if not self._has_api_key():
+            print("使用模拟数据（API密钥未配置或为默认值）")
             return self._get_mock_result(job_description, resume_content)
-        except Exception as e:
-            print(f"DeepSeek API调用失败: {e}")
-            import traceback
-            print(f"详细错误信息: {traceback.format_exc()}")
-            return self._get_mock_result(job_description, resume_content)
+        
+        prompt = self._build_prompt(job_description, resume_content)
+        data = self._build_request_data(prompt, stream=True)
+        own_session = session is None
+        
+        # 先占用并发名额再创建会话，熔断时抛出的异常不会留下未关闭的会话
+        await self.limiter.acquire_async()
+        try:
+            if own_session:
+                session = aiohttp.ClientSession(timeout=self._async_timeout())
+            attempt = 0
+            while True:
+                start = time.monotonic()
+                try:
+                    content, usage = await self._stream_completion(session, data, on_partial)
+                    self.limiter.observe(200, time.monotonic() - start)
+                    break
+                except _RetryableStatus as e:
+                    self.limiter.observe(e.status, time.monotonic() - start)
+                    if attempt >= self.http_client.max_retries:
+                        raise LLMUnavailableError(f"{self.name} API返回 {e.status}，重试次数已用尽") from e
+                    print(f"请求返回 {e.status}，第 {attempt + 1} 次重试")
+                except aiohttp.ClientResponseError as e:
+                    self.limiter.observe(e.status, time.monotonic() - start)
+                    raise
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    self.limiter.observe(None, time.monotonic() - start)
+                    if attempt >= self.http_client.max_retries:
+                        raise LLMUnavailableError(f"{self.name} API网络请求失败: {e!r}") from e
+                await asyncio.sleep(self.http_client._backoff(attempt))
+                attempt += 1
+        finally:
+            self.limiter.release()
+            if own_session and session is not None:
+                await session.close()
+        
+        token_usage = self._token_usage(usage, prompt, content)
+        parsed_result, errors = self._parse_result(content)
+        if errors:
+            # 修正请求很少发生，放到线程池中同步执行
+            parsed_result, reask_usage = await asyncio.get_running_loop().run_in_executor(
+                None, self._reask, content, errors
+            )
+            token_usage = self._merge_token_usage(token_usage, reask_usage)
+        parsed_result['token_usage'] = token_usage
+        print(f"解析结果: {parsed_result['total_score']}分")
+        return parsed_result
     
-    def _build_prompt(self, job_description, resume_content):
-        """构建提示词"""
-        result_example = """
-        {
-            "dimension_scores": {
-                "职位职能": {"score": 85, "reason": "简历中的工作经历与岗位职能高度相关", "suggestion": "可以进一步突出相关项目经验"},
-                "学历要求": {"score": 90, "reason": "学历符合岗位要求", "suggestion": "无"},
-                "专业要求": {"score": 80, "reason": "专业背景基本匹配", "suggestion": "可以补充相关专业课程"},
-                "工作年限": {"score": 75, "reason": "工作经验略低于要求", "suggestion": "突出项目经验和技能成长"},
-                "专业技能": {"score": 88, "reason": "具备岗位所需的核心技能", "suggestion": "可以增加具体技术栈的深度描述"}
-            },
-            "total_score": 83.6,
-            "overall_assessment": "简历与岗位匹配度良好，具备较强的竞争力",
-            "improvement_suggestions": [
-                "增加相关项目经验的详细描述",
-                "突出技术栈的深度和广度",
-                "量化工作成果和贡献"
-            ]
-        }
+    async def analyze_many(self, pairs, concurrency=None, on_partial=None, on_result=None, on_error=None, before_call=None):
         """
+        在单个事件循环中并发分析多组(key, 岗位描述, 简历内容)，返回与pairs顺序一致的结果列表
+
+        on_partial(key, partial): 流式部分得分回调
+        on_result(key, result): 单个结果完成回调
+        on_error(key, error): 单个请求失败回调，提供时失败的位置返回None，否则异常向上抛出
+        on_result 和 on_error 可以是协程函数（例如把数据库写入放到线程中执行），此时会被等待
+        before_call(key, job_description, resume_content): 可选协程，发起请求前等待（用于限流）
+        """
+        concurrency = max(1, int(concurrency or os.getenv('MATCH_ASYNC_CONCURRENCY', 100)))
+        semaphore = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
         
+        async with aiohttp.ClientSession(connector=connector, timeout=self._async_timeout()) as session:
+            async def run_one(key, job_description, resume_content):
+                async with semaphore:
+                    try:
+                        if before_call:
+                            await before_call(key, job_description, resume_content)
+                        result = await self.analyze_match_async(
+                            job_description, resume_content, session=session,
+                            on_partial=(lambda partial: on_partial(key, partial)) if on_partial else None
+                        )
+                    except Exception as e:
+                        if not on_error:
+                            raise
+                        outcome = on_error(key, e)
+                        if inspect.isawaitable(outcome):
+                            await outcome
+                        return None
+                if on_result:
+                    outcome = on_result(key, result)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                return result
+            
+            return await asyncio.gather(*(run_one(*pair) for pair in pairs))
+    
+    async def _stream_completion(self, session, data, on_partial=None):
+        """发送流式请求并拼接返回内容，返回 (内容, 服务端返回的token用量或None)"""
+        parser = IncrementalJSONParser(openers='{')
+        usage = None
+        last_partial = None
+        async with session.post(self.base_url, headers=self._build_headers(), json=data) as response:
+            if response.status in RETRY_STATUS_CODES:
+                raise _RetryableStatus(response.status)
+            response.raise_for_status()
+            
+            # 按行读取SSE数据：data: {...}，以 data: [DONE] 结束
+            async for raw_line in response.content:
+                line = raw_line.decode('utf-8').strip()
+                if not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                chunk = json.loads(payload)
+                # 开启 include_usage 后，最后一个数据块携带整个请求的token用量
+                usage = chunk.get('usage') or usage
+                if not chunk.get('choices'):
+                    continue
+                delta = chunk['choices'][0].get('delta', {}).get('content')
+                if not delta:
+                    continue
+                # JSON闭合后的内容（通常是说明文字）不再提取部分得分
+                was_complete = parser.complete
+                parser.feed(delta)
+                
+                if on_partial and not was_complete:
+                    partial = self._extract_partial_scores(parser.text)
+                    if partial != last_partial:
+                        last_partial = partial
+                        on_partial(partial)
+        
+        return parser.text, usage
+    
+    @staticmethod
+    def _extract_partial_scores(content):
+        """从尚未完整的JSON文本中提取已经输出的维度得分和总分"""
+        partial = {'dimension_scores': {}}
+        for match in _DIMENSION_SCORE_PATTERN.finditer(content):
+            partial['dimension_scores'][match.group(1)] = float(match.group(2))
+        total = _TOTAL_SCORE_PATTERN.search(content)
+        if total:
+            partial['total_score'] = float(total.group(1))
+        return partial
+    
+    def _has_api_key(self):
+        if not self.requires_api_key:
+            return True
+        return bool(self.api_key) and self.api_key != 'your_deepseek_api_key_here'
+    
+    def _build_headers(self):
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+    
+    @staticmethod
+    def _token_usage(usage, prompt, content):
+        """本次请求的token用量，服务端未返回usage时按本地估算"""
+        if usage and usage.get('prompt_tokens') is not None:
+            return {
+                'prompt_tokens': usage['prompt_tokens'],
+                'completion_tokens': usage.get('completion_tokens') or 0,
+                'estimated': False
+            }
+        return {
+            'prompt_tokens': estimate_tokens(prompt),
+            'completion_tokens': estimate_tokens(content),
+            'estimated': True
+        }
+    
+    @staticmethod
+    def _merge_token_usage(usage, extra):
+        """合并原请求和修正请求的token用量"""
+        return {
+            'prompt_tokens': usage['prompt_tokens'] + extra['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'] + extra['completion_tokens'],
+            'estimated': usage['estimated'] or extra['estimated']
+        }
+    
+    def estimate_request_tokens(self, job_description, resume_content):
+        """估算单份简历请求的提示词token数（按压缩后的内容计算，用于限流）"""
+        return (estimate_tokens(compress_job_description(job_description))
+                + estimate_tokens(compress_resume(resume_content)))
+    
+    def _build_request_data(self, prompt, stream=False, max_tokens=None):
+        data = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens or self.max_output_tokens
+        }
+        if stream:
+            data["stream"] = True
+            data["stream_options"] = {"include_usage": True}
+        return data
+    
+    def _async_timeout(self):
+        return aiohttp.ClientTimeout(
+            sock_connect=self.http_client.connect_timeout,
+            sock_read=self.http_client.read_timeout
+        )
+    
+    def _build_prompt(self, job_description, resume_content):
+        """构建提示词，岗位描述和简历超出token预算时按分段压缩"""
         return f"""# 你是一个招聘大数据智能分析助手，请帮我评估现有【岗位描述】、【候选人简历】之间的匹配度。
-# 岗位描述：{job_description}
-# 候选人简历：{resume_content}
-
-- 根据岗位描述获取该岗位需要以下哪些任职要求：职位职能,学历要求,专业要求,工作年限,学校要求,任职公司要求,专业技能要求,软性技能要求,加分技能要求,语言要求,证书,性别要求,年龄要求,管理能力要求,职能经验要求,行业经验要求。
-- 根据获取到的岗位任职要求和简历信息作多维度细化分析，岗位介绍中没有提及的任职要求对简历不做要求，计算得出简历和岗位涉及到任职要求的匹配度。
-- 整理并逐条以json的格式返回下面信息：各维度匹配得分、打分原因、修改建议、匹配度总分(总分为100%)。不返回岗位任职要求。
+# 岗位描述：{compress_job_description(job_description)}
+# 候选人简历：{compress_resume(resume_content)}
 
+{_SCORING_INSTRUCTIONS}
 请确保返回的是有效的JSON格式。
 返回结果的json例子为:
-{result_example}
+{_RESULT_EXAMPLE}
+"""
+    
+    def _build_packed_prompt(self, job_description, resumes):
+        """构建多简历打包提示词，岗位描述和评分说明只出现一次"""
+        resume_blocks = '\n'.join(
+            f"## 简历ID: {resume_id}\n{compress_resume(resume_content)}\n" for resume_id, resume_content in resumes
+        )
+        return f"""# 你是一个招聘大数据智能分析助手，请帮我分别评估现有【岗位描述】与下面每一份【候选人简历】之间的匹配度。
+# 岗位描述：{compress_job_description(job_description)}
+# 候选人简历（共{len(resumes)}份，每份以"## 简历ID: "开头）：
+{resume_blocks}
+{_SCORING_INSTRUCTIONS}- 每份简历单独评估，返回一个JSON数组，数组中每个元素对应一份简历，必须包含与上面一致的"resume_id"字段，其余字段与下面的例子相同。
+
+请确保返回的是有效的JSON格式。
+返回结果中单个元素的json例子为:
+{_RESULT_EXAMPLE}
+"""
+    
+    def _build_reask_prompt(self, content, errors):
+        """构建修正提示词：只包含原输出和问题列表，不再重复岗位描述和简历"""
+        problems = '\n'.join(f"- {error}" for error in errors)
+        return f"""下面是你刚才对简历与岗位匹配度的评估输出，但它不是有效的结果JSON：
+{content[-4000:]}
+
+存在的问题：
+{problems}
+
+请根据原输出中的评估内容修正这些问题，只返回修正后的JSON，不要包含其他文字。结构与下面的例子相同：
+{_RESULT_EXAMPLE}
 """
     
-    def _parse_response(self, content):
-        """解析API返回的内容"""
+    def _parse_result(self, content):
+        """容错解析单份简历的返回内容，返回 (结果, 错误列表)，错误列表为空时结果有效"""
+        return normalize_match_result(parse_json(content, accept=_is_match_result))
+    
+    def _reask(self, content, errors):
+        """
+        把无效的输出和问题列表发回模型要求只返回修正后的JSON，返回 (结果, 修正请求的token用量)
+
+        未开启修正或修正后仍然无效时抛出InvalidResultError
+        """
+        if not self.json_reask:
+            raise InvalidResultError(errors)
+        print(f"{self.name} 返回的结果无效（{'; '.join(errors)}），请求模型修正")
+        prompt = self._build_reask_prompt(content, errors)
+        self.limiter.acquire()
         try:
-            # 尝试从内容中提取JSON
-            if '```json' in content:
-                json_str = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                json_str = content.split('```')[1].strip()
-            else:
-                json_str = content.strip()
-            
-            # 清理可能的非JSON内容
-            json_str = json_str.replace('```', '').strip()
-            
-            result = json.loads(json_str)
-            return result
-            
-        except json.JSONDecodeError:
-            # 如果解析失败，返回默认结构
-            return self._get_default_structure()
+            response = self.http_client.post(
+                self.base_url, headers=self._build_headers(),
+                json=self._build_request_data(prompt, max_tokens=min(self.max_output_tokens, _REASK_MAX_OUTPUT_TOKENS)),
+                observer=self.limiter.observe
+            )
+            if response.status_code in RETRY_STATUS_CODES:
+                raise LLMUnavailableError(f"{self.name} API返回 {response.status_code}，重试次数已用尽")
+            response.raise_for_status()
+            body = response.json()
+            fixed = body['choices'][0]['message']['content']
+        except requests.exceptions.RequestException as e:
+            raise LLMUnavailableError(f"{self.name} API网络请求失败: {e}") from e
+        finally:
+            self.limiter.release()
+        
+        result, errors = self._parse_result(fixed)
+        if errors:
+            raise InvalidResultError(errors)
+        return result, self._token_usage(body.get('usage'), prompt, fixed)
+    
+    def pack_resumes(self, job_description, resumes, token_budget=None, max_per_request=None):
+        """
+        按token预算把(简历ID, 简历内容)列表分组，每组在一次请求中打分
+
+        预算同时计入提示词和预计的输出token
+        """
+        token_budget = int(token_budget or os.getenv('MATCH_PACK_TOKEN_BUDGET', 12000))
+        max_per_request = int(max_per_request or os.getenv('MATCH_PACK_MAX_RESUMES', 8))
+        base_tokens = estimate_tokens(self._build_packed_prompt(job_description, []))
+        
+        packs = []
+        current = []
+        used = base_tokens
+        for resume_id, resume_content in resumes:
+            cost = estimate_tokens(compress_resume(resume_content)) + _PACKED_OUTPUT_TOKENS_PER_RESUME
+            if current and (used + cost > token_budget or len(current) >= max_per_request):
+                packs.append(current)
+                current = []
+                used = base_tokens
+            current.append((resume_id, resume_content))
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+    
+    def analyze_match_packed(self, job_description, resumes):
+        """
+        在一次请求中为多份简历打分，返回 ({简历ID: 结果}, {简历ID: 异常})
+
+        未返回或未通过校验的简历会回退为单份调用；服务不可用时不再回退，
+        其余简历记为同一个LLMUnavailableError，由调用方按异常类型决定是否放回队列重试
+        """
+        if not resumes:
+            return {}, {}
+        if not self._has_api_key():
+            print("使用模拟数据（API密钥未配置或为默认值）")
+            return {
+                resume_id: self._get_mock_result(job_description, resume_content) for resume_id, resume_content in resumes
+            }, {}
+        
+        expected_ids = [resume_id for resume_id, _ in resumes]
+        prompt = self._build_packed_prompt(job_description, resumes)
+        results = {}
+        try:
+            self.limiter.acquire()
+        except LLMUnavailableError as e:
+            print(f"{self.name} API暂不可用，{len(resumes)} 份简历稍后重试: {e}")
+            return results, dict.fromkeys(expected_ids, e)
+        try:
+            data = self._build_request_data(
+                prompt, max_tokens=min(_MAX_OUTPUT_TOKENS, _PACKED_OUTPUT_TOKENS_PER_RESUME * len(resumes) + 200)
+            )
+            print(f"调用{self.name} API（打包 {len(resumes)} 份简历），请求数据长度: {len(prompt)} 字符")
+            response = self.http_client.post(
+                self.base_url, headers=self._build_headers(), json=data, observer=self.limiter.observe
+            )
+            if response.status_code in RETRY_STATUS_CODES:
+                print(f"{self.name} API返回 {response.status_code}，{len(resumes)} 份简历稍后重试")
+                return results, dict.fromkeys(
+                    expected_ids, LLMUnavailableError(f"{self.name} API返回 {response.status_code}，重试次数已用尽")
+                )
+            response.raise_for_status()
+            body = response.json()
+            content = body['choices'][0]['message']['content']
+            results = self._split_packed_results(parse_json(content, accept=_is_packed_results), expected_ids)
+            self._split_token_usage(results, resumes, self._token_usage(body.get('usage'), prompt, content))
+        except requests.exceptions.RequestException as e:
+            print(f"{self.name} API打包调用失败，{len(resumes)} 份简历稍后重试: {e}")
+            return results, dict.fromkeys(expected_ids, LLMUnavailableError(f"{self.name} API网络请求失败: {e}"))
+        except Exception as e:
+            print(f"{self.name} API打包调用失败: {e}")
+        finally:
+            self.limiter.release()
+        
+        errors = {}
+        missing = [(resume_id, resume_content) for resume_id, resume_content in resumes if resume_id not in results]
+        if missing:
+            print(f"打包结果中 {len(missing)} 份简历缺失或无效，回退为单份调用")
+        for index, (resume_id, resume_content) in enumerate(missing):
+            try:
+                results[resume_id] = self.analyze_match(job_description, resume_content)
+            except InvalidResultError as e:
+                print(f"简历 {resume_id} 单份调用结果无效，稍后重试: {e}")
+                errors[resume_id] = e
+            except LLMUnavailableError as e:
+                print(f"简历 {resume_id} 单份调用失败，稍后重试: {e}")
+                errors.update(dict.fromkeys((resume_id for resume_id, _ in missing[index:]), e))
+                break
+        return results, errors
+    
+    @staticmethod
+    def _split_token_usage(results, resumes, usage):
+        """把打包请求的token用量按各简历压缩后的长度分摊到每个结果"""
+        weights = {
+            resume_id: estimate_tokens(compress_resume(resume_content))
+            for resume_id, resume_content in resumes if resume_id in results
+        }
+        total = sum(weights.values()) or 1
+        for resume_id, weight in weights.items():
+            results[resume_id]['token_usage'] = {
+                'prompt_tokens': round(usage['prompt_tokens'] * weight / total),
+                'completion_tokens': round(usage['completion_tokens'] * weight / total),
+                'estimated': usage['estimated']
+            }
+    
+    def _split_packed_results(self, result, expected_ids):
+        """把打包返回的数组按简历ID拆分并逐条规整，丢弃修复后仍不完整的条目"""
+        if isinstance(result, dict):
+            result = result.get('results', [])
+        if not isinstance(result, list):
+            return {}
+        
+        ids_by_text = {str(resume_id): resume_id for resume_id in expected_ids}
+        split = {}
+        for item in result:
+            if not isinstance(item, dict):
+                continue
+            resume_id = ids_by_text.get(str(item.pop('resume_id', '')).strip())
+            if resume_id is None or resume_id in split:
+                continue
+            normalized, errors = normalize_match_result(item)
+            if not errors:
+                split[resume_id] = normalized
+        return split
     
     def _get_mock_result(self, job_description, resume_content):
-        """获取模拟结果（用于测试或API不可用时）"""
+        """获取模拟结果（仅在未配置API密钥时使用）"""
         return {
+            "mock": True,
             "dimension_scores": {
                 "职位职能": {"score": 85, "reason": "简历中的工作经历与岗位职能高度相关", "suggestion": "可以进一步突出相关项目经验"},
                 "学历要求": {"score": 90, "reason": "学历符合岗位要求", "suggestion": "无"},
@@ -139,12 +576,3 @@ class DeepSeekService:
                 "量化工作成果和贡献"
             ]
         }
-    
-    def _get_default_structure(self):
-        """获取默认的返回结构"""
-        return {
-            "dimension_scores": {},
-            "total_score": 0,
-            "overall_assessment": "分析结果解析失败",
-            "improvement_suggestions": []
-        }
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import queue
+import threading
+
+
+class FileCleaner:
+    """
+    后台删除文件的清理线程，删除简历时不在请求中逐个unlink
+
+    keep: 可选的回调，返回True的路径不会被删除（例如文件在排队期间又被重新上传）
+    """
+
+    def __init__(self, keep=None):
+        self.keep = keep
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='file-cleaner')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def remove(self, paths):
+        """把待删除的文件加入队列，立即返回"""
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        for path in paths:
+            self._queue.put(path)
+        self._ensure_thread()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if not (self.keep and self.keep(path)) and os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                print(f"Error deleting file {path}: {str(e)}")
@@ -0,0 +1,85 @@
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# 需要重试的HTTP状态码（限流和服务端错误）
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """
+    线程安全的HTTP客户端，复用连接池并在429/5xx时按指数退避加随机抖动重试
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=None, backoff_max=None):
+        self.pool_size = int(pool_size or os.getenv('DEEPSEEK_POOL_SIZE', 10))
+        self.connect_timeout = float(connect_timeout or os.getenv('DEEPSEEK_CONNECT_TIMEOUT', 10))
+        self.read_timeout = float(read_timeout or os.getenv('DEEPSEEK_READ_TIMEOUT', 120))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv('DEEPSEEK_MAX_RETRIES', 3))
+        self.backoff_base = float(backoff_base or os.getenv('DEEPSEEK_BACKOFF_BASE', 1.0))
+        self.backoff_max = float(backoff_max or os.getenv('DEEPSEEK_BACKOFF_MAX', 30))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt, response=None):
+        """计算第attempt次重试前的等待时间，优先遵循Retry-After响应头"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def post(self, url, observer=None, **kwargs):
+        """
+        发送POST请求，可重试的错误在重试次数用尽后抛出
+
+        observer: 可选回调 observer(状态码, 耗时秒数)，每次尝试后调用，网络错误时状态码为None
+        """
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if observer:
+                    observer(None, time.monotonic() - start)
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            if observer:
+                observer(response.status_code, time.monotonic() - start)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                print(f"请求返回 {response.status_code}，第 {attempt + 1} 次重试")
+                time.sleep(self._backoff(attempt, response))
+                attempt += 1
+                continue
+            return response
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """获取进程内共享的HTTP客户端"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = HTTPClient()
+    return _shared_client
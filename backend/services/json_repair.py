@@ -0,0 +1,322 @@
+import re
+import json
+import itertools
+
+# 模型偶尔在JSON结构中使用全角标点
+_FULLWIDTH_PUNCTUATION = {'，': ',', '：': ':', '｛': '{', '｝': '}', '［': '[', '］': ']'}
+_NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?%?')
+_WORD_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_\-]*')
+_LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false', 'None': 'null'}
+_SCORE_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+_VALUE_START_PATTERN = re.compile(r'[{\[｛［]')
+# parse_json 最多尝试的起始位置数
+_MAX_CANDIDATES = 8
+
+
+class InvalidResultError(ValueError):
+    """模型返回的内容无法解析或修复后仍不符合匹配结果的结构"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class _Frame:
+    """repair_json 中一层未闭合的对象或数组"""
+
+    def __init__(self, closer, member_start):
+        self.closer = closer
+        self.member_start = member_start
+        # start: 等待键（对象）或值（数组）；key: 已读到键；colon: 已读到冒号；
+        # string: 值是字符串；literal: 值是数字或字面量（截断时可能不完整）；done: 值已完整
+        self.state = 'start'
+
+
+def _closes_string(text, index):
+    """引号后面是分隔符、换行或文本结尾时才视为字符串结束，否则是字符串中未转义的引号"""
+    rest = text[index:]
+    stripped = rest.lstrip()
+    return not stripped or stripped[0] in ',:}]，：｝］' or '\n' in rest[:len(rest) - len(stripped)]
+
+
+def _start_value(out, frame):
+    """开始写入一个值前补上缺失的逗号或冒号，返回该值在对象中是否处于键的位置"""
+    if frame.state in ('done', 'literal'):
+        out.append(',')
+        frame.member_start = len(out)
+        frame.state = 'start'
+    if frame.closer == '}':
+        if frame.state == 'start':
+            return True
+        if frame.state == 'key':
+            out.append(':')
+    return False
+
+
+def _drop_incomplete_member(out, frame):
+    """删除被截断的成员（只有键、只有冒号或数字可能不完整），以及随后多余的逗号"""
+    if frame.state in ('key', 'colon', 'literal'):
+        del out[frame.member_start:]
+    while out and (out[-1].isspace() or out[-1] == ','):
+        out.pop()
+
+
+def repair_json(text, start=None):
+    """
+    从文本中取出第一个JSON对象或数组并修复常见问题，返回可以交给json.loads的字符串，找不到时返回None
+
+    start: 值开始的位置，默认为第一个 { 或 [
+
+    - 跳过前后的说明文字和 ``` 代码块标记，只取第一个括号平衡的值
+    - 去掉注释、多余和末尾的逗号，补上缺失的逗号和冒号，全角标点改为半角
+    - 单引号字符串、未加引号的键、Python的True/False/None、"85%"形式的数字
+    - 字符串中未转义的换行和引号
+    - 输出被截断（例如达到max_tokens）时删除不完整的成员并补全括号
+    """
+    if start is None:
+        match = _VALUE_START_PATTERN.search(text)
+        if not match:
+            return None
+        start = match.start()
+    i = start
+    n = len(text)
+    out = []
+    stack = []
+    quote = None
+    while i < n:
+        ch = text[i]
+        if quote:
+            if ch == '\\' and i + 1 < n:
+                out.append(text[i:i + 2] if text[i + 1] != "'" else "'")
+                i += 2
+                continue
+            if ch == quote and _closes_string(text, i + 1):
+                out.append('"')
+                quote = None
+                frame = stack[-1]
+                if frame.state == 'string':
+                    frame.state = 'done'
+            elif ch == '"':
+                # 字符串中未转义的引号
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            elif ch == '\t':
+                out.append('\\t')
+            elif ch != '\r':
+                out.append(ch)
+            i += 1
+            continue
+
+        if text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+
+        ch = _FULLWIDTH_PUNCTUATION.get(ch, ch)
+        frame = stack[-1] if stack else None
+        if ch in '"\'':
+            if frame is None:
+                break
+            is_key = _start_value(out, frame)
+            frame.state = 'key' if is_key else 'string'
+            quote = ch
+            out.append('"')
+        elif ch in '{[':
+            if frame is not None:
+                _start_value(out, frame)
+                frame.state = 'done'
+            out.append(ch)
+            stack.append(_Frame('}' if ch == '{' else ']', len(out)))
+        elif ch in '}]':
+            if frame is None:
+                break
+            if frame.state in ('key', 'colon'):
+                del out[frame.member_start:]
+            while out and (out[-1].isspace() or out[-1] == ','):
+                out.pop()
+            # 括号不匹配时按实际打开的结构闭合
+            out.append(frame.closer)
+            stack.pop()
+            if not stack:
+                break
+        elif ch == ',':
+            if frame is not None and frame.state in ('done', 'literal'):
+                out.append(',')
+                frame.member_start = len(out)
+                frame.state = 'start'
+        elif ch == ':':
+            if frame is not None and frame.state == 'key':
+                out.append(':')
+                frame.state = 'colon'
+        elif ch.isspace():
+            if out:
+                out.append(ch)
+        else:
+            number = _NUMBER_PATTERN.match(text, i)
+            word = None if number else _WORD_PATTERN.match(text, i)
+            if frame is None or not (number or word):
+                # 结构之间的其他字符（例如中文说明）直接跳过
+                i += 1
+                continue
+            token = (number or word).group()
+            is_key = _start_value(out, frame)
+            if is_key:
+                out.append(json.dumps(token))
+                frame.state = 'key'
+            elif number:
+                out.append(token.rstrip('%'))
+                frame.state = 'literal'
+            elif token in _LITERALS:
+                out.append(_LITERALS[token])
+                frame.state = 'literal'
+            else:
+                out.append(json.dumps(token))
+                frame.state = 'done'
+            i += len(token)
+            continue
+        i += 1
+
+    # 输出被截断：补全字符串，删除不完整的成员，按打开的顺序闭合
+    if quote:
+        out.append('"')
+        if stack[-1].state == 'string':
+            stack[-1].state = 'done'
+    while stack:
+        frame = stack.pop()
+        _drop_incomplete_member(out, frame)
+        out.append(frame.closer)
+    return ''.join(out)
+
+
+def parse_json(text, accept=None):
+    """
+    严格解析失败时修复后再解析，仍然失败返回None
+
+    accept: 可选的校验函数。正文前可能有括号开头的说明（例如 "[注意] {...}"），
+    此时依次从每个 { 或 [ 开始尝试，返回第一个通过校验的值；都不通过时返回第一个解析成功的值
+    """
+    text = text or ''
+    try:
+        value = json.loads(text.strip().strip('`').strip())
+        if accept is None or accept(value):
+            return value
+    except ValueError:
+        pass
+    first = None
+    for match in itertools.islice(_VALUE_START_PATTERN.finditer(text), _MAX_CANDIDATES):
+        try:
+            value = json.loads(repair_json(text, match.start()))
+        except ValueError:
+            continue
+        if accept is None or accept(value):
+            return value
+        if first is None:
+            first = value
+    return first
+
+
+class IncrementalJSONParser:
+    """
+    逐块接收流式输出，跟踪字符串和括号深度，第一个JSON值的括号闭合时 complete 变为True
+
+    openers: 视为值开始的括号，只需要对象时传入 '{'，避免正文前的 "[注意]" 之类的说明被当作结果
+    value(accept) 返回解析（必要时修复）后的结果，流被截断时也会尽量返回已输出的部分
+    """
+
+    def __init__(self, openers='{['):
+        self.openers = openers
+        self._parts = []
+        self._length = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self.complete = False
+
+    def feed(self, chunk):
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if self.complete:
+            return
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._started:
+                self._in_string = True
+            elif ch in self.openers and not self._started or ch in '{[' and self._started:
+                self._started = True
+                self._depth += 1
+            elif ch in '}]' and self._started:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+                    return
+
+    @property
+    def text(self):
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def value(self, accept=None):
+        return parse_json(self.text, accept)
+
+
+def _coerce_score(value):
+    """把 85、"85"、"85分"、"85%" 转为0~100的数值，无法转换时返回None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = _SCORE_PATTERN.search(value)
+        value = float(match.group()) if match else None
+    if not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        return None
+    return value
+
+
+def normalize_match_result(result):
+    """
+    按匹配结果的结构校验并规整，返回 (结果, 错误列表)
+
+    维度得分允许直接写成数字，无效的维度被丢弃；total_score 缺失或无效时记为错误（维度平均分不能代替
+    模型给出的总分，由调用方请求修正）；缺少的说明字段补为空值。错误列表为空时结果可以直接保存
+    """
+    if isinstance(result, list) and len(result) == 1:
+        result = result[0]
+    if not isinstance(result, dict):
+        return None, ['返回内容不是JSON对象']
+
+    errors = []
+    dimension_scores = {}
+    raw_dimensions = result.get('dimension_scores')
+    if not isinstance(raw_dimensions, dict):
+        raw_dimensions = {}
+    for dimension, detail in raw_dimensions.items():
+        if not isinstance(detail, dict):
+            detail = {'score': detail}
+        score = _coerce_score(detail.get('score'))
+        # 个别维度无效（例如输出被截断）时只丢弃该维度
+        if score is not None:
+            dimension_scores[dimension] = dict(detail, score=score)
+    if not dimension_scores:
+        errors.append('缺少有效的dimension_scores（各维度的score应为0~100的数值）')
+
+    total_score = _coerce_score(result.get('total_score'))
+    if total_score is None:
+        errors.append('缺少total_score或不是0~100的数值')
+
+    normalized = dict(result, dimension_scores=dimension_scores, total_score=total_score)
+    normalized.setdefault('overall_assessment', '')
+    if not isinstance(normalized.get('improvement_suggestions'), list):
+        normalized['improvement_suggestions'] = []
+    return normalized, errors
@@ -0,0 +1,83 @@
+import os
+import threading
+from .deepseek_service import DeepSeekService
+
+# 内置的LLM服务提供方，均使用OpenAI兼容的 /v1/chat/completions 接口
+# 每项配置的值为 (环境变量名, 默认值)
+PROVIDER_CONFIGS = {
+    'deepseek': {
+        'base_url': ('DEEPSEEK_BASE_URL', 'https://api.deepseek.com/v1/chat/completions'),
+        'api_key': ('DEEPSEEK_API_KEY', None),
+        'model': ('DEEPSEEK_MODEL', 'deepseek-chat'),
+    },
+    # 任意OpenAI兼容服务（OpenAI、Azure代理、vLLM等）
+    'openai': {
+        'base_url': ('OPENAI_BASE_URL', 'https://api.openai.com/v1/chat/completions'),
+        'api_key': ('OPENAI_API_KEY', None),
+        'model': ('OPENAI_MODEL', 'gpt-4o-mini'),
+    },
+    # 本地模型服务或 mock_llm_server.py，不需要API密钥
+    'local': {
+        'base_url': ('LOCAL_LLM_BASE_URL', 'http://127.0.0.1:8001/v1/chat/completions'),
+        'api_key': ('LOCAL_LLM_API_KEY', 'local'),
+        'model': ('LOCAL_LLM_MODEL', 'local-model'),
+        'requires_api_key': False,
+    },
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def default_provider_name():
+    return os.getenv('LLM_PROVIDER', 'deepseek')
+
+
+def provider_names():
+    return list(PROVIDER_CONFIGS)
+
+
+def get_llm_provider(name=None):
+    """
+    按名称获取进程内共享的LLM服务实例，未指定时使用 LLM_PROVIDER 环境变量
+
+    名称不存在时抛出ValueError
+    """
+    name = name or default_provider_name()
+    if name not in PROVIDER_CONFIGS:
+        raise ValueError(f'Unknown LLM provider: {name}')
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                config = PROVIDER_CONFIGS[name]
+                provider = DeepSeekService(
+                    name=name,
+                    base_url=os.getenv(*config['base_url']),
+                    api_key=os.getenv(*config['api_key']),
+                    model=os.getenv(*config['model']),
+                    requires_api_key=config.get('requires_api_key', True)
+                )
+                _providers[name] = provider
+    return provider
+
+
+def circuit_pause():
+    """已创建的服务中熔断器仍处于打开状态的最长剩余秒数，没有熔断时为0"""
+    return max([provider.limiter.breaker.remaining() for provider in list(_providers.values())] or [0.0])
+
+
+def describe_providers():
+    """列出可用的服务提供方及其模型、是否已配置密钥，以及自适应并发和熔断状态"""
+    return [
+        {
+            'name': name,
+            'model': get_llm_provider(name).model,
+            'base_url': get_llm_provider(name).base_url,
+            'configured': get_llm_provider(name)._has_api_key(),
+            'default': name == default_provider_name(),
+            'limiter': get_llm_provider(name).limiter.stats()
+        }
+        for name in PROVIDER_CONFIGS
+    ]
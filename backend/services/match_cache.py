@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+class MatchCache:
+    """
+    基于内容哈希的匹配结果持久化缓存
+
+    缓存键由规范化后的岗位描述、简历内容、模型名称和提示词版本计算得出，
+    支持TTL过期和LRU淘汰，并统计命中/未命中次数
+    """
+
+    def __init__(self, db_path, ttl=None, max_entries=None):
+        self.db_path = db_path
+        self.ttl = int(ttl if ttl is not None else os.getenv('MATCH_CACHE_TTL', 7 * 24 * 3600))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv('MATCH_CACHE_MAX_ENTRIES', 10000))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS match_cache (
+                key TEXT PRIMARY KEY,
+                job_id INTEGER,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_match_cache_job_id ON match_cache (job_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_match_cache_accessed_at ON match_cache (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(text):
+        return ' '.join((text or '').split())
+
+    @staticmethod
+    def make_key(job_description, resume_content, model, prompt_version):
+        """根据匹配输入计算缓存键"""
+        payload = '\x1f'.join([
+            MatchCache._normalize(job_description),
+            MatchCache._normalize(resume_content),
+            model or '',
+            str(prompt_version)
+        ])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result, created_at FROM match_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute('DELETE FROM match_cache WHERE key = ?', (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE match_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, job_id, result):
+        """写入缓存，超出容量时按最近访问时间淘汰"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO match_cache (key, job_id, result, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, job_id, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM match_cache').fetchone()[0]
+            overflow = count - self.max_entries
+            if self.max_entries and overflow > 0:
+                self._conn.execute(
+                    'DELETE FROM match_cache WHERE key IN '
+                    '(SELECT key FROM match_cache ORDER BY accessed_at ASC LIMIT ?)',
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def invalidate_job(self, job_id):
+        """删除某个岗位的所有缓存结果"""
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM match_cache WHERE job_id = ?', (job_id,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute('DELETE FROM match_cache')
+            self._conn.commit()
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM match_cache').fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0,
+                'ttl': self.ttl,
+                'max_entries': self.max_entries
+            }
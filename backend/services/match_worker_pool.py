@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateLimiter:
+    """
+    基于令牌桶的速率限制器，同时限制每分钟请求数和每分钟token数
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+        self._request_allowance = float(self.requests_per_minute)
+        self._token_allowance = float(self.tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def _reserve(self, tokens):
+        """尝试扣减额度，成功返回0，否则返回建议等待的秒数"""
+        with self._lock:
+            self._refill()
+            request_ok = not self.requests_per_minute or self._request_allowance >= 1
+            token_ok = not self.tokens_per_minute or self._token_allowance >= tokens
+            if request_ok and token_ok:
+                if self.requests_per_minute:
+                    self._request_allowance -= 1
+                if self.tokens_per_minute:
+                    self._token_allowance -= tokens
+                return 0
+            wait = 0.0
+            if not request_ok:
+                wait = max(wait, (1 - self._request_allowance) * 60.0 / self.requests_per_minute)
+            if not token_ok:
+                wait = max(wait, (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+            return min(max(wait, 0.01), 1.0)
+
+    def _clamp(self, tokens):
+        # 单个请求超过整桶容量时按整桶计算，避免永久阻塞
+        return min(tokens, self.tokens_per_minute) if self.tokens_per_minute else tokens
+
+    def acquire(self, tokens=0):
+        """阻塞直到允许发出一个消耗tokens个token的请求"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        tokens = self._clamp(tokens)
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """acquire的协程版本，等待期间不占用事件循环"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        tokens = self._clamp(tokens)
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class MatchWorkerPool:
+    """
+    有界的匹配任务线程池，按配置的并发数和速率限制执行匹配任务
+    """
+
+    def __init__(self, concurrency=None, requests_per_minute=None, tokens_per_minute=None):
+        self.concurrency = max(1, int(concurrency or os.getenv('MATCH_CONCURRENCY', 4)))
+        self.rate_limiter = RateLimiter(
+            int(requests_per_minute if requests_per_minute is not None else os.getenv('MATCH_REQUESTS_PER_MINUTE', 0)),
+            int(tokens_per_minute if tokens_per_minute is not None else os.getenv('MATCH_TOKENS_PER_MINUTE', 0))
+        )
+
+    def acquire(self, tokens=0):
+        """在发出LLM请求前调用，按速率限制等待"""
+        self.rate_limiter.acquire(tokens)
+
+    def run(self, items, worker):
+        """
+        并发执行worker(item)，返回与items顺序一致的结果列表
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='match-worker') as executor:
+            return list(executor.map(worker, items))
@@ -1,59 +1,74 @@
+import re
 import PyPDF2
-import io
+
+# 常见简历分段关键词
+SECTION_KEYWORDS = ['教育背景', '工作经历', '项目经验', '专业技能', '自我评价',
+                    'Education', 'Experience', 'Projects', 'Skills', 'Summary']
+
+# 所有关键词合并为一个预编译正则，每个片段只需扫描一次
+_SECTION_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in SECTION_KEYWORDS))
+
+# 常见的PDF解析问题：空字符和BOM标记
+_REMOVE_CHARS = str.maketrans('', '', '\x00\ufeff')
 
 class PDFParser:
+    # 修改文本提取或 _clean_text 的逻辑时递增，已入库的简历可以通过 reparse_resumes.py 增量重新解析
+    VERSION = 1
+
+    @staticmethod
+    def iter_pages(file):
+        """
+        逐页提取PDF文本的生成器，不需要一次性持有全部页面文本
+        """
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages:
+            yield page.extract_text()
+
     @staticmethod
     def parse_pdf(file):
         """
         解析PDF文件并提取文本内容
         """
+        return PDFParser.parse_document(file)[0]
+
+    @staticmethod
+    def parse_document(file):
+        """
+        解析PDF文件，返回 (清理后的文本内容, 页数)
+        """
         try:
-            # 读取PDF文件
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # 提取所有页面的文本
-            text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
-            
+            # 提取所有页面的文本（列表累积后一次性拼接）
+            page_texts = [page_text + "\n" for page_text in PDFParser.iter_pages(file)]
+            text_content = ''.join(page_texts)
+
             # 清理文本内容
             cleaned_content = PDFParser._clean_text(text_content)
-            
-            return cleaned_content
-            
+
+            return cleaned_content, len(page_texts)
+
         except Exception as e:
             raise Exception(f"PDF解析失败: {str(e)}")
-    
+
     @staticmethod
     def _clean_text(text):
         """
         清理和格式化文本内容
         """
-        # 移除多余的空白字符
-        cleaned = ' '.join(text.split())
-        
-        # 处理常见的PDF解析问题
-        cleaned = cleaned.replace('\x00', '')  # 移除空字符
-        cleaned = cleaned.replace('\ufeff', '')  # 移除BOM标记
-        
+        # 移除空字符和BOM标记，并合并多余的空白字符
+        cleaned = ' '.join(text.translate(_REMOVE_CHARS).split())
+
         # 分段处理（基于常见的关键词）
         sections = []
         current_section = []
-        
-        # 常见简历分段关键词
-        section_keywords = ['教育背景', '工作经历', '项目经验', '专业技能', '自我评价', 
-                           'Education', 'Experience', 'Projects', 'Skills', 'Summary']
-        
-        lines = cleaned.split('.')
-        for line in lines:
+
+        for line in cleaned.split('.'):
             line = line.strip()
-            if any(keyword in line for keyword in section_keywords):
-                if current_section:
-                    sections.append(' '.join(current_section))
-                    current_section = []
+            if current_section and _SECTION_PATTERN.search(line):
+                sections.append(' '.join(current_section))
+                current_section = []
             current_section.append(line)
-        
+
         if current_section:
             sections.append(' '.join(current_section))
-        
-        return '\n\n'.join(sections) if sections else cleaned
\ No newline at end of file
+
+        return '\n\n'.join(sections) if sections else cleaned
@@ -0,0 +1,138 @@
+import os
+import re
+from .token_counter import estimate_tokens
+
+# 分段的保留优先级：超出预算时优先压缩低优先级的段落
+SECTION_PRIORITIES = {
+    '工作经历': 3, 'Experience': 3,
+    '项目经验': 3, 'Projects': 3,
+    '专业技能': 3, 'Skills': 3,
+    '教育背景': 2, 'Education': 2,
+    '自我评价': 1, 'Summary': 1,
+}
+# 简历开头没有分段标题的部分（姓名、联系方式、求职意向等）
+_HEADER_PRIORITY = 2
+_DEFAULT_PRIORITY = 1
+
+# 压缩后每个段落至少保留的token数，不足时只保留段落标题
+_MIN_SECTION_TOKENS = 40
+
+# 页码、页眉页脚等对匹配无意义的内容
+_BOILERPLATE_PATTERN = re.compile(
+    r'第\s*\d+\s*页(\s*[/，,]?\s*共\s*\d+\s*页)?|Page\s+\d+(\s+of\s+\d+)?|\b\d+\s*/\s*\d+\s*页',
+    re.IGNORECASE
+)
+_SENTENCE_END_PATTERN = re.compile(r'[。；;！!？?]')
+_TRUNCATED_MARK = '…'
+
+
+def resume_token_budget():
+    return int(os.getenv('PROMPT_RESUME_TOKEN_BUDGET', 3000))
+
+
+def job_token_budget():
+    return int(os.getenv('PROMPT_JOB_TOKEN_BUDGET', 1500))
+
+
+def _strip_boilerplate(text, seen=None):
+    """
+    去掉页码和重复出现的句子（例如每页重复的页眉），并合并空白
+
+    seen: 已出现过的句子，在同一份简历的各段落间共享，重复的页眉通常分散在不同段落中
+    """
+    text = _BOILERPLATE_PATTERN.sub(' ', text)
+    seen = set() if seen is None else seen
+    sentences = []
+    for sentence in re.split(r'(?<=[。；;！!？?])', text):
+        key = ''.join(sentence.split())
+        if len(key) >= 8 and key in seen:
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    return ' '.join(''.join(sentences).split())
+
+
+def _section_priority(section, index):
+    head = section[:20]
+    for keyword, priority in SECTION_PRIORITIES.items():
+        if keyword in head:
+            return priority
+    return _HEADER_PRIORITY if index == 0 else _DEFAULT_PRIORITY
+
+
+def truncate_text(text, budget):
+    """把文本截断到约budget个token，尽量在句子结尾处截断"""
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        return text
+    cut = max(1, int(len(text) * budget / tokens))
+    while cut > 1 and estimate_tokens(text[:cut]) > budget:
+        cut = int(cut * 0.9)
+    head = text[:cut]
+    ends = [match.end() for match in _SENTENCE_END_PATTERN.finditer(head)]
+    if ends and ends[-1] >= cut // 2:
+        head = head[:ends[-1]]
+    return head.rstrip() + _TRUNCATED_MARK
+
+
+def _allocate(costs, weights, budget):
+    """
+    按权重分配token预算：需求小于份额的段落完整保留，剩余预算在其余段落间继续按权重分配
+    """
+    shares = [0] * len(costs)
+    remaining = set(range(len(costs)))
+    while remaining:
+        total_weight = sum(weights[i] * costs[i] for i in remaining)
+        fitted = [
+            i for i in remaining
+            if costs[i] <= budget * weights[i] * costs[i] / total_weight
+        ]
+        if not fitted:
+            for i in remaining:
+                shares[i] = int(budget * weights[i] * costs[i] / total_weight)
+            break
+        for i in fitted:
+            shares[i] = costs[i]
+            budget -= costs[i]
+            remaining.discard(i)
+    return shares
+
+
+def compress_resume(content, budget=None):
+    """
+    在token预算内压缩简历正文
+
+    先去掉页码和重复句子；仍超出预算时按 PDFParser._clean_text 切分出的段落（以空行分隔）
+    分配预算，工作经历、项目经验、专业技能优先保留，超出份额的段落截断到句子边界，
+    份额过小的段落只保留标题
+    """
+    budget = budget or resume_token_budget()
+    if not content or estimate_tokens(content) <= budget:
+        return content
+    seen = set()
+    sections = [_strip_boilerplate(section, seen) for section in content.split('\n\n')]
+    sections = [section for section in sections if section]
+    text = '\n\n'.join(sections)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    costs = [estimate_tokens(section) for section in sections]
+    weights = [_section_priority(section, i) for i, section in enumerate(sections)]
+    shares = _allocate(costs, weights, budget)
+    compressed = []
+    for section, cost, share in zip(sections, costs, shares):
+        if share >= cost:
+            compressed.append(section)
+        elif share >= _MIN_SECTION_TOKENS:
+            compressed.append(truncate_text(section, share))
+        else:
+            compressed.append(truncate_text(section, 8))
+    return '\n\n'.join(compressed)
+
+
+def compress_job_description(description, budget=None):
+    """岗位描述超出预算时去掉页码等冗余内容后截断"""
+    budget = budget or job_token_budget()
+    if not description or estimate_tokens(description) <= budget:
+        return description
+    return truncate_text(_strip_boilerplate(description), budget)
@@ -0,0 +1,121 @@
+import os
+import uuid
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from .pdf_parser import PDFParser
+from .retriever import build_term_vector
+
+# 上传文件写盘时每次读取的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+
+def save_upload(file_storage, upload_dir):
+    """
+    将上传文件按块流式写入临时文件，同时计算SHA-256
+
+    返回 (文件哈希, 字节数, 临时文件路径)，由调用方决定移动到内容地址还是丢弃
+    """
+    temp_path = os.path.join(upload_dir, f'.upload-{uuid.uuid4().hex}.part')
+    digest = hashlib.sha256()
+    size = 0
+    stream = file_storage.stream
+    with open(temp_path, 'wb') as output:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            output.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size, temp_path
+
+
+def hash_file(file_path):
+    """按块计算已存储文件的SHA-256（与 save_upload 的哈希一致）"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_path(upload_dir, file_hash):
+    """按内容哈希得到简历文件的存储路径"""
+    return os.path.join(upload_dir, f'{file_hash}.pdf')
+
+
+def parse_resume_file(file_path):
+    """在解析进程中执行：从磁盘读取PDF并提取文本，返回 (文本, 页数, 初筛用的词频向量)"""
+    content, page_count = PDFParser.parse_document(file_path)
+    return content, page_count, build_term_vector(content)
+
+
+def get_parse_executor():
+    """
+    获取进程内共享的PDF解析进程池（CPU密集型任务不占用请求线程）
+
+    Web进程中已有请求线程和worker线程，fork出的子进程可能继承被其他线程持有的锁，因此使用spawn启动解析进程
+    """
+    global _parse_executor
+    if _parse_executor is None:
+        with _parse_executor_lock:
+            if _parse_executor is None:
+                workers = int(os.getenv('INGEST_PROCESSES', 0)) or None
+                _parse_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _parse_executor
+
+
+def _replace_broken_executor(executor):
+    """解析进程崩溃后进程池不能再提交任务（BrokenProcessPool），丢弃它，下次获取时新建"""
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is executor:
+            _parse_executor = None
+    executor.shutdown(wait=False)
+
+
+def _submit_all(jobs):
+    executor = get_parse_executor()
+    try:
+        return executor, {executor.submit(parse_resume_file, file_path): (key, file_path) for key, file_path in jobs}
+    except BrokenProcessPool:
+        _replace_broken_executor(executor)
+        executor = get_parse_executor()
+        return executor, {executor.submit(parse_resume_file, file_path): (key, file_path) for key, file_path in jobs}
+
+
+def _parse_in_pool(jobs):
+    """提交一组文件并按完成顺序产出 (key, 文件路径, 结果, 异常)"""
+    _, futures = _submit_all(jobs)
+    for future in as_completed(futures):
+        key, file_path = futures[future]
+        try:
+            yield key, file_path, future.result(), None
+        except Exception as e:
+            yield key, file_path, None, e
+
+
+def parse_resume_files(jobs):
+    """
+    在解析进程池中并行解析 [(key, 文件路径)]，按完成顺序产出 (key, parse_resume_file的结果, 异常)
+
+    某个解析进程崩溃会使整个进程池失效（BrokenProcessPool），同一批中未完成的文件都会失败：
+    换用新的进程池逐个重新解析这些文件，只有真正导致崩溃的文件按失败处理
+    """
+    broken = []
+    for key, file_path, result, error in _parse_in_pool(jobs):
+        if isinstance(error, BrokenProcessPool):
+            broken.append((key, file_path))
+        else:
+            yield key, result, error
+    if broken:
+        print(f"解析进程异常退出，{len(broken)} 个文件使用新的进程池逐个重新解析")
+    for job in broken:
+        for key, _, result, error in _parse_in_pool([job]):
+            yield key, result, error
@@ -0,0 +1,109 @@
+from sqlalchemy import text
+from .retriever import tokenize
+
+# FTS5全文索引：正文预先按 retriever.tokenize 切分（中文为相邻二字组），以空格连接后写入
+# tokenchars保留 c++、c#、node.js 等技能名中的符号
+CREATE_INDEX_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5("
+    "filename, body, tokenize = \"unicode61 tokenchars '+#.'\")"
+)
+
+# bm25权重：文件名命中比正文命中更重要
+_RANK_EXPRESSION = 'bm25(resume_fts, 3.0, 1.0)'
+
+
+def _index_text(value):
+    return ' '.join(tokenize(value))
+
+
+def _single_chars(query):
+    """查询中的单个汉字：索引中只有二字组，无法通过FTS5命中，改为在原文中模糊匹配"""
+    chars = []
+    for word in query.split():
+        tokens = tokenize(word)
+        if len(tokens) == 1 and len(tokens[0]) == 1 and tokens[0] >= '一':
+            chars.append(tokens[0])
+    return chars
+
+
+def build_match_query(query):
+    """
+    把用户输入转换为FTS5查询：每个词转为一个短语（中文词的二字组必须相邻），多个词之间为AND
+
+    单个汉字不在索引中，由 search 单独处理
+    """
+    phrases = []
+    single_chars = set(_single_chars(query))
+    for word in query.split():
+        tokens = tokenize(word)
+        if tokens and not (len(tokens) == 1 and tokens[0] in single_chars):
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return ' '.join(phrases)
+
+
+def ensure_index(connection):
+    """创建索引表，并为尚未建立索引的简历补建索引"""
+    connection.execute(text(CREATE_INDEX_SQL))
+    missing = connection.execute(text(
+        'SELECT id, filename, content FROM resume WHERE id NOT IN (SELECT rowid FROM resume_fts)'
+    )).fetchall()
+    index_resumes(connection, missing)
+    return len(missing)
+
+
+def index_resumes(connection, rows):
+    """写入或更新简历索引，rows 为 [(简历ID, 文件名, 正文)]"""
+    if not rows:
+        return
+    remove_resumes(connection, [row[0] for row in rows])
+    connection.execute(
+        text('INSERT INTO resume_fts (rowid, filename, body) VALUES (:id, :filename, :body)'),
+        [
+            {'id': resume_id, 'filename': _index_text(filename), 'body': _index_text(content)}
+            for resume_id, filename, content in rows
+        ]
+    )
+
+
+def remove_resumes(connection, resume_ids):
+    if not resume_ids:
+        return
+    connection.execute(
+        text('DELETE FROM resume_fts WHERE rowid IN (SELECT value FROM json_each(:ids))'),
+        {'ids': '[' + ','.join(str(int(resume_id)) for resume_id in resume_ids) + ']'}
+    )
+
+
+def search(connection, query, limit=20, offset=0):
+    """
+    按相关度搜索简历，返回 (命中总数, [(简历ID, 得分)])
+
+    得分为FTS5 bm25取反，越大越相关；只有单个汉字时在文件名和正文中模糊匹配，得分为0，按ID倒序
+    """
+    match_query = build_match_query(query)
+    chars = _single_chars(query)
+    if not match_query and not chars:
+        return 0, []
+    params = {'query': match_query, 'limit': limit, 'offset': offset}
+    conditions = []
+    for i, char in enumerate(chars):
+        params[f'char{i}'] = f'%{char}%'
+        conditions.append(f'(resume.filename LIKE :char{i} OR resume.content LIKE :char{i})')
+    
+    if match_query:
+        source = 'resume_fts'
+        if conditions:
+            source += ' JOIN resume ON resume.id = resume_fts.rowid'
+        conditions.insert(0, 'resume_fts MATCH :query')
+        columns, order = f'resume_fts.rowid, -{_RANK_EXPRESSION} AS score', _RANK_EXPRESSION
+    else:
+        source = 'resume'
+        columns, order = 'resume.id, 0.0 AS score', 'resume.id DESC'
+    where = ' AND '.join(conditions)
+    
+    total = connection.execute(text(f'SELECT count(*) FROM {source} WHERE {where}'), params).scalar()
+    rows = connection.execute(
+        text(f'SELECT {columns} FROM {source} WHERE {where} ORDER BY {order} LIMIT :limit OFFSET :offset'),
+        params
+    ).fetchall()
+    return total, [(resume_id, round(score, 4)) for resume_id, score in rows]
@@ -0,0 +1,90 @@
+import re
+import zlib
+import numpy as np
+
+# 英文单词/技能名（保留 c++、c#、node.js 等写法）与连续中文片段
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*|[一-鿿]+')
+
+# 每份简历的词频向量：哈希后的词ID + 词频，按词ID升序存储
+TERM_DTYPE = np.dtype([('term', '<u4'), ('tf', '<u2')])
+
+
+def tokenize(text):
+    """
+    中英文混合分词：英文按单词切分并转为小写，中文片段切分为相邻二字组（单字片段保留单字）
+
+    不依赖中文分词词典，"分布式系统"会得到 分布/布式/式系/系统
+    """
+    tokens = []
+    for piece in _TOKEN_PATTERN.findall((text or '').lower()):
+        if piece[0] < '一':
+            tokens.append(piece.rstrip('.'))
+        elif len(piece) == 1:
+            tokens.append(piece)
+        else:
+            tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+def _term_ids(tokens):
+    return np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype='<u4', count=len(tokens))
+
+
+def build_term_vector(text):
+    """计算文本的词频向量并序列化为紧凑的二进制（每个不同的词6字节）"""
+    terms, counts = np.unique(_term_ids(tokenize(text)), return_counts=True)
+    vector = np.empty(len(terms), dtype=TERM_DTYPE)
+    vector['term'] = terms
+    vector['tf'] = np.minimum(counts, np.iinfo('<u2').max)
+    return vector.tobytes()
+
+
+def load_term_vector(data):
+    return np.frombuffer(data or b'', dtype=TERM_DTYPE)
+
+
+def rank_resumes(job_description, term_vectors, k1=1.2, b=0.75):
+    """
+    用BM25按岗位描述对候选简历排序，文档频率基于本批候选简历统计
+
+    term_vectors: [(简历ID, 序列化的词频向量)]
+    返回 [(简历ID, 归一化得分)]，按得分降序，最高分为1
+    """
+    if not term_vectors:
+        return []
+    query_terms = np.unique(_term_ids(tokenize(job_description)))
+    vectors = [load_term_vector(data) for _, data in term_vectors]
+    doc_lengths = np.array([int(vector['tf'].sum()) for vector in vectors], dtype=np.float64)
+    avg_length = max(doc_lengths.mean(), 1.0)
+
+    # 把所有简历的词频向量拼接在一起，一次性找出命中查询词的位置
+    flat = np.concatenate(vectors)
+    doc_index = np.repeat(np.arange(len(vectors)), [len(vector) for vector in vectors])
+    hits = np.isin(flat['term'], query_terms)
+    hit_terms = flat['term'][hits]
+    hit_tf = flat['tf'][hits].astype(np.float64)
+    hit_docs = doc_index[hits]
+
+    # 每个查询词在多少份简历中出现（同一简历内词ID唯一）
+    unique_terms, term_positions, document_frequency = np.unique(hit_terms, return_inverse=True, return_counts=True)
+    total = len(vectors)
+    idf = np.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    norm = k1 * (1 - b + b * doc_lengths[hit_docs] / avg_length)
+    contributions = idf[term_positions] * hit_tf * (k1 + 1) / (hit_tf + norm)
+    scores = np.bincount(hit_docs, weights=contributions, minlength=total)
+
+    top = scores.max() if total else 0
+    if top > 0:
+        scores = scores / top
+    order = np.argsort(-scores, kind='stable')
+    return [(term_vectors[i][0], round(float(scores[i]), 4)) for i in order]
+
+
+def shortlist(ranked, top_k=None, min_score=None):
+    """按Top-K和/或最低归一化得分截取候选名单"""
+    if min_score is not None:
+        ranked = [item for item in ranked if item[1] >= float(min_score)]
+    if top_k:
+        ranked = ranked[:int(top_k)]
+    return ranked
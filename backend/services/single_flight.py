@@ -0,0 +1,86 @@
+import os
+import threading
+
+
+class _Call:
+    """一次进行中的调用，等待者共享它的结果或异常"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError('等待相同请求的结果超时')
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    进程内的相同请求合并：同一个key同时只执行一次，其余并发调用等待并共享结果
+
+    do(key, fn) 适合单次调用；批量执行时可以用 begin/finish 为多个key同时担任执行者
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = float(timeout or os.getenv('SINGLE_FLIGHT_TIMEOUT', 600))
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._shared = 0
+        self._failed = 0
+
+    def begin(self, key):
+        """
+        登记对key的调用，返回 (call, 是否为执行者)
+
+        执行者必须在结束后调用 finish；其他调用者通过 call.wait() 等待结果
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._shared += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._executed += 1
+            return call, True
+
+    def finish(self, key, result=None, error=None):
+        """发布执行结果并唤醒等待者；key不在进行中时忽略（允许重复调用）"""
+        with self._lock:
+            call = self._calls.pop(key, None)
+            if call is None:
+                return
+            if error is not None:
+                self._failed += 1
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def do(self, key, fn):
+        """执行fn或等待进行中的相同调用，返回 (结果, 是否为共享的结果)"""
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait(self.timeout), True
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self._executed,
+                'shared': self._shared,
+                'failed': self._failed
+            }
@@ -0,0 +1,100 @@
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class TaskRegistry:
+    """
+    有容量上限、按TTL过期的进程内任务进度登记表
+
+    - 已结束的任务在TTL之后被淘汰
+    - 任务数超过上限时，优先淘汰最早结束的任务，仍超出时淘汰最早创建的任务
+    - 记录只保存紧凑的进度信息（状态、计数、ID、得分），完整结果从数据库查询
+    """
+
+    def __init__(self, name, max_tasks=None, ttl=None):
+        self.name = name
+        self.max_tasks = max(int(max_tasks or os.getenv('TASK_REGISTRY_MAX_TASKS', 1000)), 1)
+        self.ttl = float(ttl if ttl is not None else os.getenv('TASK_REGISTRY_TTL', 3600))
+        self._tasks = OrderedDict()
+        self._finished_at = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._evicted_expired = 0
+        self._evicted_capacity = 0
+
+    def _evict(self):
+        """在持有锁时调用：淘汰过期和超出容量的任务"""
+        now = time.time()
+        for task_id, finished_at in list(self._finished_at.items()):
+            if now - finished_at < self.ttl:
+                break
+            del self._finished_at[task_id]
+            self._tasks.pop(task_id, None)
+            self._evicted_expired += 1
+
+        while len(self._tasks) > self.max_tasks:
+            if self._finished_at:
+                task_id = next(iter(self._finished_at))
+                del self._finished_at[task_id]
+            else:
+                task_id = next(iter(self._tasks))
+            self._tasks.pop(task_id, None)
+            self._evicted_capacity += 1
+
+    def create(self, task_id, record):
+        """登记新任务（已存在时覆盖）"""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            self._finished_at.pop(task_id, None)
+            self._tasks[task_id] = record
+            self._created += 1
+            self._evict()
+
+    @contextmanager
+    def edit(self, task_id, default=None):
+        """
+        在锁内修改任务记录，任务不存在（或已被淘汰）时得到None
+
+        传入default时，任务不存在会先以default登记
+        """
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None and default is not None:
+                record = self._tasks[task_id] = default
+                self._created += 1
+                self._evict()
+            yield record
+
+    def get(self, task_id):
+        """返回任务记录的副本，不存在时返回None"""
+        with self._lock:
+            self._evict()
+            record = self._tasks.get(task_id)
+            return copy.deepcopy(record) if record is not None else None
+
+    def finish(self, task_id):
+        """标记任务结束，TTL从此刻开始计算"""
+        with self._lock:
+            if task_id in self._tasks:
+                self._finished_at.pop(task_id, None)
+                self._finished_at[task_id] = time.time()
+            self._evict()
+
+    def stats(self):
+        """登记表统计：存活/已结束任务数和累计淘汰数"""
+        with self._lock:
+            self._evict()
+            return {
+                'name': self.name,
+                'live': len(self._tasks) - len(self._finished_at),
+                'finished': len(self._finished_at),
+                'created': self._created,
+                'evicted_expired': self._evicted_expired,
+                'evicted_capacity': self._evicted_capacity,
+                'max_tasks': self.max_tasks,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,8 @@
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数（中文约1字1token，英文约4字符1token）
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '一' <= ch <= '鿿')
+    return cjk + (len(text) - cjk) // 4 + 1
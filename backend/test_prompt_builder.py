@@ -0,0 +1,47 @@
+"""
+prompt_builder 的压缩逻辑测试
+
+用法：python -m pytest test_prompt_builder.py
+"""
+from services.prompt_builder import compress_resume, truncate_text
+from services.token_counter import estimate_tokens
+
+HEADER = '张三 求职意向：高级后端工程师，联系电话13800000000。'
+
+
+def _paged_resume():
+    """模拟每页都带有相同页眉的简历：页眉分散在不同的段落中"""
+    pages = [
+        '教育背景 北京大学 计算机科学与技术 本科。' + '主修课程包括数据结构和操作系统。' * 5,
+        '工作经历 在某互联网公司负责后端服务开发。' + '使用Python和Kubernetes搭建微服务。' * 5,
+        '项目经验 负责推荐系统的召回和排序模块。' + '日均处理千万级请求。' * 5,
+    ]
+    return '\n\n'.join(f'{HEADER}第 {i + 1} 页 共 {len(pages)} 页 {page}' for i, page in enumerate(pages))
+
+
+def test_repeated_header_across_sections_is_removed():
+    content = _paged_resume()
+    compressed = compress_resume(content, budget=estimate_tokens(content) - 1)
+
+    assert content.count(HEADER) == 3
+    assert compressed.count(HEADER) == 1
+    assert '第 2 页' not in compressed
+    assert '工作经历' in compressed and '项目经验' in compressed
+
+
+def test_resume_within_budget_is_unchanged():
+    content = _paged_resume()
+    assert compress_resume(content, budget=estimate_tokens(content)) == content
+
+
+def test_compressed_resume_fits_budget():
+    content = _paged_resume()
+    budget = estimate_tokens(content) // 3
+    assert estimate_tokens(compress_resume(content, budget=budget)) <= budget + 10
+
+
+def test_truncate_text_cuts_at_sentence_end():
+    text = '第一句话比较短。第二句话也不长。' * 20
+    truncated = truncate_text(text, 30)
+    assert truncated.endswith('。…')
+    assert estimate_tokens(truncated) <= 31
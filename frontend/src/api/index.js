@@ -47,8 +47,24 @@ export default {
   },
   
   // 简历相关API
-  getResumes() {
-    return api.get('/resumes')
+  getResumes(params = {}) {
+    return api.get('/resumes', { params })
+  },
+  
+  // 按游标分页读取全部简历摘要（用于选择简历等需要完整列表的场景）
+  async getAllResumes() {
+    let items = []
+    let cursor = null
+    do {
+      const response = await api.get('/resumes', { params: { limit: 1000, cursor } })
+      items = items.concat(response.data.items)
+      cursor = response.data.next_cursor
+    } while (cursor)
+    return { data: items }
+  },
+  
+  getResume(id) {
+    return api.get(`/resumes/${id}`)
   },
   
   uploadResume(formData) {
@@ -59,6 +75,14 @@ export default {
     })
   },
   
+  searchResumes(params) {
+    return api.get('/resumes/search', { params })
+  },
+  
+  getIngestProgress(ingestId) {
+    return api.get(`/resumes/ingest/${ingestId}`)
+  },
+  
   deleteResume(id) {
     return api.delete(`/resumes/${id}`)
   },
@@ -80,8 +104,50 @@ export default {
     return api.get(`/match-progress/${taskId}`)
   },
   
-  getMatchResults() {
-    return api.get('/match-results')
+  // 订阅匹配进度事件流（SSE），只推送增量：item 每份简历结束一条，status 状态变化，summary 任务结束
+  // 断线后浏览器会自动带上 Last-Event-ID 重连；重新打开页面时可传入 lastEventId 从该事件之后继续
+  streamMatchProgress(taskId, handlers = {}, { lastEventId } = {}) {
+    const query = lastEventId ? `?last_event_id=${encodeURIComponent(lastEventId)}` : ''
+    const source = new EventSource(`/api/match-progress/${taskId}/stream${query}`)
+    const listen = (event, handler) => {
+      if (!handler) return
+      source.addEventListener(event, (e) => handler(JSON.parse(e.data), e.lastEventId))
+    }
+    listen('item', handlers.onItem)
+    listen('status', handlers.onStatus)
+    source.addEventListener('summary', (e) => {
+      source.close()
+      if (handlers.onSummary) handlers.onSummary(JSON.parse(e.data))
+    })
+    source.onerror = () => {
+      // CONNECTING 表示浏览器正在自动重连，只有连接被彻底关闭时才通知调用方
+      if (source.readyState === EventSource.CLOSED && handlers.onError) handlers.onError()
+    }
+    return source
+  },
+  
+  createMatrixMatch(data) {
+    return api.post('/matrix-match', data)
+  },
+  
+  getMatrixProgress(taskId, params = {}) {
+    return api.get(`/matrix-match/${taskId}`, { params })
+  },
+  
+  getLlmProviders() {
+    return api.get('/llm-providers')
+  },
+  
+  cancelMatchTask(taskId) {
+    return api.post(`/match-tasks/${taskId}/cancel`)
+  },
+  
+  getMatchResults(params = {}) {
+    return api.get('/match-results', { params })
+  },
+  
+  getMatchResult(id) {
+    return api.get(`/match-results/${id}`)
   },
   
   deleteMatchResult(id) {